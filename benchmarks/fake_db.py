@@ -0,0 +1,102 @@
+##############################################################
+## Exasol MCP server with Text-to-SQL query option          ##
+## Benchmark: Fake database connection                      ##
+##----------------------------------------------------------##
+## Version 1.0.0 DirkB@Exasol : Initial version             ##
+##############################################################
+
+"""
+Stands in for the DbConnection of the Exasol MCP server. Catalog queries on
+EXA_ALL_COLUMNS return a synthetic schema of tables T_0 .. T_n with columns
+C_0 .. C_m; every other query returns a synthetic result set of configurable size.
+Both wait for a configurable latency, like a round trip to the database.
+"""
+
+import threading
+import time
+
+
+COLUMN_TYPES = ("DECIMAL(18,0)", "VARCHAR(2000000) UTF8", "DATE", "DOUBLE", "BOOLEAN", "TIMESTAMP")
+
+
+class FakeStatement:
+
+    def __init__(self, columns: list, rows) -> None:
+        self._columns = columns
+        self._rows = list(rows)
+        self._position = 0
+
+    def __iter__(self):
+
+        while self._position < len(self._rows):
+            row = self._rows[self._position]
+            self._position += 1
+            yield row
+
+    def fetchmany(self, size: int) -> list:
+
+        batch = self._rows[self._position:self._position + size]
+        self._position += len(batch)
+
+        return batch
+
+    def column_names(self) -> list:
+
+        return list(self._columns)
+
+    def rowcount(self) -> int:
+
+        return len(self._rows)
+
+    def close(self) -> None:
+
+        self._rows = []
+
+
+class FakeDbConnection:
+
+    def __init__(self, tables: int = 20, columns: int = 10, rows: int = 100,
+                 catalog_latency: float = 0.05, query_latency: float = 0.05) -> None:
+        self.tables = tables
+        self.columns = columns
+        self.rows = rows
+        self.catalog_latency = catalog_latency
+        self.query_latency = query_latency
+        self.catalog_queries = 0
+        self.user_queries = 0
+        self._lock = threading.Lock()
+
+    def catalog(self, db_schema: str) -> list:
+
+        return [{"COLUMN_SCHEMA": db_schema,
+                 "COLUMN_TABLE": f"T_{table}",
+                 "COLUMN_NAME": f"C_{column}",
+                 "COLUMN_TYPE": COLUMN_TYPES[column % len(COLUMN_TYPES)],
+                 "COLUMN_COMMENT": f"Column {column} of table {table}" if column % 3 == 0 else None}
+                for table in range(self.tables) for column in range(self.columns)]
+
+    def result_set(self) -> FakeStatement:
+
+        columns = [f"C_{column}" for column in range(self.columns)]
+        rows = ({name: row * 1000 + position for position, name in enumerate(columns)} for row in range(self.rows))
+
+        return FakeStatement(columns, rows)
+
+    def execute_query(self, query: str, snapshot: bool = False) -> FakeStatement:
+
+        if "EXA_ALL_COLUMNS" in query.upper():
+            time.sleep(self.catalog_latency)
+            with self._lock:
+                self.catalog_queries += 1
+            db_schema = query.split("COLUMN_SCHEMA = '")[-1].split("'")[0]
+            rows = self.catalog(db_schema)
+            return FakeStatement(list(rows[0].keys()) if rows else [], rows)
+
+        time.sleep(self.query_latency)
+        with self._lock:
+            self.user_queries += 1
+
+        return self.result_set()
+
+    def close(self) -> None:
+        pass
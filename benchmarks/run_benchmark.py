@@ -0,0 +1,277 @@
+##############################################################
+## Exasol MCP server with Text-to-SQL query option          ##
+## Benchmark: End-to-end driver                             ##
+##----------------------------------------------------------##
+## Version 1.0.0 DirkB@Exasol : Initial version             ##
+##############################################################
+
+"""
+Drives the Text-to-SQL graph and the MCP tools against the stub LLM server and the
+fake database at increasing concurrency, and reports p50/p95/p99 latency, requests
+per second and the peak RSS of the process for every level.
+
+    python -m benchmarks.run_benchmark --mode tool --concurrency 1,4,16 --requests 64
+
+The environment of the server is set up here before its modules are imported, variables
+already set in the shell (e.g. EXA_MCP_RELEVANCE_CHECK) take precedence. Results can be
+appended to a JSONL file with --output, to compare runs over time.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_db import FakeDbConnection
+from benchmarks.stub_llm import StubLLMConfig, start_stub_llm
+
+
+MODES = ("graph", "tool", "batch", "audit", "teach")
+BATCH_SIZE = 8
+
+
+def configure_environment(llm_url: str, work_dir: str) -> None:
+    """ Settings of the server for the benchmark, must run before the server modules are imported. """
+
+    defaults = {
+        "EXA_DSN": "fake:8563",
+        "EXA_USER": "benchmark",
+        "EXA_PASSWORD": "benchmark",
+        "EXA_MCP_LLM_SERVER_URL": llm_url,
+        "EXA_MCP_LLM_SERVER_API_KEY": "stub",
+        "EXA_MCP_LLM_TRANSFORMATION": "stub",
+        "EXA_MCP_LLM_RENDERING": "stub",
+        "EXA_MCP_VECTORDB_FILE": os.path.join(work_dir, "vectordb"),
+        "EXA_MCP_VECTORDB_SIMILARITY_DISTANCE": "0.3",
+        "EXA_MCP_LOGGER": "False",
+        "EXA_MCP_LOGGER_MODE": "info",
+        "EXA_MCP_LOGGER_FILE": os.path.join(work_dir, "benchmark.log"),
+        "EXA_MCP_LLM_TEMPERATURE_RELEVANCE": "0",
+        "EXA_MCP_LLM_TEMPERATURE_TRANSLATION": "0",
+        "EXA_MCP_LLM_TEMPERATURE_QUERY_REWRITE": "0",
+        "EXA_MCP_LLM_TEMPERATURE_RENDERING": "0",
+        "EXA_MCP_LLM_TEMPERATURE_INFO": "0",
+        "EXA_MCP_MAX_QUEUED_REQUESTS": "100000",
+    }
+
+    for name, value in defaults.items():
+        os.environ.setdefault(name, value)
+
+
+def peak_rss_bytes() -> int:
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    ## Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(values: list, q: float) -> float:
+
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def questions(count: int, distinct: int, tables: int, columns: int, level: int = 0) -> list:
+    """ Questions of one concurrency level; different levels never ask the same question. """
+
+    return [f"Show the values of column C_{i % columns} of table T_{i % tables} above {i % distinct} (run {level})"
+            for i in range(count)]
+
+
+def git_revision() -> str:
+
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+async def run_level(call, items: list, concurrency: int) -> dict:
+
+    slots = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(item) -> None:
+        nonlocal errors
+        async with slots:
+            start_time = time.perf_counter()
+            try:
+                await call(item)
+            except Exception as e:
+                errors += 1
+                print(f"  error: {e}", file=sys.stderr)
+            latencies.append(time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(one(item) for item in items))
+    wall_time = time.perf_counter() - start_time
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(items),
+        "errors": errors,
+        "wall_time": wall_time,
+        "rps": len(items) / wall_time if wall_time > 0 else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "peak_rss_mb": peak_rss_bytes() / (1024 * 1024),
+    }
+
+
+async def benchmark(args, connection: FakeDbConnection) -> list:
+
+    ## Imported only now: the server reads its environment at import time
+
+    from exasol_mcp_server_governed_sql.database_functions import result_cache, schema_cache
+    from exasol_mcp_server_governed_sql.embedding_cache import embedding_cache
+    from exasol_mcp_server_governed_sql.intro import GraphState, env
+    from exasol_mcp_server_governed_sql.main import Text2SQL, sql_audit, teach_sql
+    from exasol_mcp_server_governed_sql.text_to_sql import t2s_start_process
+
+    print(f"caches: schema={'on' if schema_cache.ttl > 0 else 'off'} "
+          f"embedding={'on' if embedding_cache.max_entries > 0 else 'off'} "
+          f"result={'on' if result_cache.enabled else 'off'} "
+          f"sql_reuse={'on' if float(env['vectordb_reuse_distance'] or 0) > 0 else 'off'} "
+          f"(cleared before every level)")
+
+    text2sql = Text2SQL(connection)
+    db_schema = args.db_schema
+
+    async def graph(question: str):
+        return await t2s_start_process(GraphState(question=question, db_schema=db_schema, connection=connection))
+
+    async def tool(question: str):
+        return await text2sql.text_to_sql(question=question, db_schema=db_schema)
+
+    async def batch(chunk: list):
+        return await text2sql.text_to_sql_batch(questions=chunk, db_schema=db_schema)
+
+    async def audit(question: str):
+        return await sql_audit(search_text=question, db_schema=db_schema)
+
+    async def teach(question: str):
+        return await asyncio.to_thread(teach_sql, question=question,
+                                       sql_statement='SELECT "C_0" FROM "T_0"', db_schema=db_schema)
+
+    calls = {"graph": graph, "tool": tool, "batch": batch, "audit": audit, "teach": teach}
+
+    results = []
+
+    for level, concurrency in enumerate(args.concurrency):
+
+        ## Every level starts cold and asks new questions, so the levels stay comparable:
+        ## neither the caches nor SQL reuse of the VectorDB serve answers of an earlier level
+
+        schema_cache.invalidate()
+        result_cache.invalidate()
+        embedding_cache.clear()
+
+        items = questions(args.requests, args.distinct_questions, args.tables, args.columns, level)
+        if args.mode == "batch":
+            items = [items[i:i + BATCH_SIZE] for i in range(0, len(items), BATCH_SIZE)]
+
+        result = await run_level(calls[args.mode], items, concurrency)
+        results.append(result)
+
+        print(f"{args.mode:>6} c={concurrency:<4} n={result['requests']:<5} err={result['errors']:<3} "
+              f"p50={result['p50']:.3f}s p95={result['p95']:.3f}s p99={result['p99']:.3f}s "
+              f"rps={result['rps']:.2f} rss={result['peak_rss_mb']:.0f}MB")
+
+    ## Like the lifespan of the server: the async LLM pools are closed on their own loop
+
+    from exasol_mcp_server_governed_sql.llm import aclose_llm_clients
+    await aclose_llm_clients()
+
+    return results
+
+
+def parse_args():
+
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the Text-to-SQL MCP server")
+    parser.add_argument("--mode", default="tool", choices=MODES,
+                        help="graph: the LangGraph process; tool/batch/audit/teach: the MCP tools (default: tool)")
+    parser.add_argument("--concurrency", default="1,4,16",
+                        type=lambda text: [int(level) for level in text.split(",")],
+                        help="Comma separated concurrency levels (default: 1,4,16)")
+    parser.add_argument("--requests", default=64, type=int, help="Questions per concurrency level (default: 64)")
+    parser.add_argument("--distinct-questions", default=64, type=int,
+                        help="Number of different questions, fewer ones exercise the caches (default: 64)")
+    parser.add_argument("--db-schema", default="BENCH", help="Schema name of the fake database (default: BENCH)")
+    parser.add_argument("--tables", default=20, type=int, help="Tables of the synthetic schema (default: 20)")
+    parser.add_argument("--columns", default=10, type=int, help="Columns per table (default: 10)")
+    parser.add_argument("--rows", default=100, type=int, help="Rows per result set (default: 100)")
+    parser.add_argument("--catalog-latency", default=0.05, type=float, help="Seconds per catalog query (default: 0.05)")
+    parser.add_argument("--query-latency", default=0.05, type=float, help="Seconds per user query (default: 0.05)")
+    parser.add_argument("--llm-latency", default=0.2, type=float, help="Seconds per LLM answer (default: 0.2)")
+    parser.add_argument("--llm-jitter", default=0.0, type=float, help="Random +/- seconds per LLM answer")
+    parser.add_argument("--llm-url", default="", help="Use a running stub (or real) LLM server instead")
+    parser.add_argument("--output", default="", help="Append the results as a JSON line to this file")
+
+    return parser.parse_args()
+
+
+def main() -> None:
+
+    args = parse_args()
+
+    stub_server = None
+    llm_url = args.llm_url
+    if not llm_url:
+        stub_server, llm_url = start_stub_llm(config=StubLLMConfig(latency=args.llm_latency, jitter=args.llm_jitter))
+
+    work_dir = tempfile.mkdtemp(prefix="t2s-benchmark-")
+    configure_environment(llm_url, work_dir)
+
+    from exasol_mcp_server_governed_sql.intro import setup_logging
+    from exasol_mcp_server_governed_sql.main import check_vectordb, shutdown
+
+    setup_logging()
+
+    connection = FakeDbConnection(tables=args.tables, columns=args.columns, rows=args.rows,
+                                  catalog_latency=args.catalog_latency, query_latency=args.query_latency)
+
+    check_vectordb()
+
+    try:
+        results = asyncio.run(benchmark(args, connection))
+    finally:
+        shutdown()
+        if stub_server is not None:
+            stub_server.shutdown()
+
+    print(f"catalog queries: {connection.catalog_queries}, user queries: {connection.user_queries}")
+
+    if args.output:
+        record = {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "settings": {name: value for name, value in vars(args).items() if name != "output"},
+            "environment": {name: value for name, value in os.environ.items()
+                            if name.startswith("EXA_MCP_") and "KEY" not in name and "PASSWORD" not in name},
+            "results": results,
+        }
+        with open(args.output, "a", encoding="utf-8") as file:
+            file.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+
+    main()
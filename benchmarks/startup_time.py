@@ -0,0 +1,127 @@
+##############################################################
+## Exasol MCP server with Text-to-SQL query option          ##
+## Benchmark: Startup time of the STDIO server              ##
+##----------------------------------------------------------##
+## Version 1.0.0 DirkB@Exasol : Initial version             ##
+##############################################################
+
+"""
+Measures in fresh processes, like an MCP client starting the server per session:
+
+- import:    the time to import exasol_mcp_server_governed_sql.main, with the modules
+             taking longest to import (python -X importtime)
+- handshake: the time from starting the STDIO server until it answers 'initialize'
+
+    python -m benchmarks.startup_time --runs 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.run_benchmark import configure_environment, percentile
+
+
+IMPORT_MAIN = "import exasol_mcp_server_governed_sql.main"
+RUN_STDIO_SERVER = "from exasol_mcp_server_governed_sql.main import main; main()"
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {"protocolVersion": "2025-06-18",
+               "capabilities": {},
+               "clientInfo": {"name": "startup-benchmark", "version": "1.0.0"}},
+}
+
+
+def import_time() -> tuple:
+    """ Returns the wall time of the import and the self-reported import times per module. """
+
+    start_time = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", IMPORT_MAIN],
+                             capture_output=True, text=True, env=os.environ.copy())
+    elapsed = time.perf_counter() - start_time
+
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "import failed")
+
+    modules = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [part.strip() for part in line[len("import time:"):].split("|")]
+        if parts[1].isdigit():
+            modules[parts[2].strip()] = int(parts[1])
+
+    return elapsed, modules
+
+
+def handshake_time(timeout: float) -> float:
+    """ Starts the STDIO server and returns the seconds until it answers 'initialize'. """
+
+    start_time = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", RUN_STDIO_SERVER], stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+                               env=os.environ.copy())
+    try:
+        process.stdin.write(json.dumps(INITIALIZE) + "\n")
+        process.stdin.flush()
+
+        while time.perf_counter() - start_time < timeout:
+            line = process.stdout.readline()
+            if not line:
+                raise RuntimeError("the server stopped before answering")
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message.get("id") == INITIALIZE["id"]:
+                return time.perf_counter() - start_time
+
+        raise RuntimeError(f"no answer within {timeout} seconds")
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Startup time of the Text-to-SQL MCP server")
+    parser.add_argument("--runs", default=5, type=int, help="Fresh processes per measurement (default: 5)")
+    parser.add_argument("--top", default=15, type=int, help="Slowest modules to list (default: 15)")
+    parser.add_argument("--timeout", default=60.0, type=float, help="Seconds to wait for the handshake (default: 60)")
+    args = parser.parse_args()
+
+    ## No LLM is called during startup, the URL only has to be set
+
+    configure_environment("http://127.0.0.1:9/v1", tempfile.mkdtemp(prefix="t2s-startup-"))
+
+    import_times, handshake_times, modules = [], [], {}
+
+    for _ in range(args.runs):
+        elapsed, modules = import_time()
+        import_times.append(elapsed)
+
+    for _ in range(args.runs):
+        try:
+            handshake_times.append(handshake_time(args.timeout))
+        except RuntimeError as e:
+            print(f"handshake failed: {e}", file=sys.stderr)
+
+    print(f"import    p50={percentile(import_times, 0.5):.3f}s max={max(import_times):.3f}s (n={len(import_times)})")
+    if handshake_times:
+        print(f"handshake p50={percentile(handshake_times, 0.5):.3f}s max={max(handshake_times):.3f}s (n={len(handshake_times)})")
+
+    print("\nSlowest imports (cumulative, last run):")
+    for module, microseconds in sorted(modules.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {microseconds / 1e6:8.3f}s  {module}")
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,180 @@
+##############################################################
+## Exasol MCP server with Text-to-SQL query option          ##
+## Benchmark: OpenAI-compatible stub LLM server             ##
+##----------------------------------------------------------##
+## Version 1.0.0 DirkB@Exasol : Initial version             ##
+##############################################################
+
+"""
+Answers '/v1/chat/completions' like an OpenAI compatible server, after a configurable
+latency, with canned structured outputs. The requested output model is taken from the
+'response_format' (json_schema) or the 'tools' (function calling) of the request; every
+property of the schema is answered from CANNED_OUTPUTS, unknown ones with a placeholder.
+
+Standalone:  python -m benchmarks.stub_llm --port 8099 --latency 0.5
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CANNED_OUTPUTS = {
+    "is_relevant": "YES",
+    "sql_query": 'SELECT "C_0", "C_1" FROM "T_0" LIMIT 10',
+    "display_result": "The stub answer for the benchmark.",
+    "new_question": "Show the first ten rows of T_0.",
+    "info_about_relevance": "The question does not fit the schema.",
+    "info_about_bad_sql_type": "Only SELECT statements are allowed.",
+    "info_unable_create_sql": "No valid SQL statement could be created.",
+}
+
+
+def _estimate_tokens(text: str) -> int:
+
+    return len(text) // 4 + 1
+
+
+def _requested_output(body: dict) -> tuple:
+    """ Returns the name and JSON schema of the requested output, and whether tools are used. """
+
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        json_schema = response_format.get("json_schema", {})
+        return json_schema.get("name", "output"), json_schema.get("schema", {}), False
+
+    for tool in body.get("tools") or []:
+        function = tool.get("function", {})
+        return function.get("name", "output"), function.get("parameters", {}), True
+
+    return "output", {}, False
+
+
+def canned_answer(schema: dict, outputs: dict) -> dict:
+
+    return {name: outputs.get(name, "stub") for name in schema.get("properties", {})}
+
+
+class StubLLMConfig:
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, outputs: dict = None) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.outputs = {**CANNED_OUTPUTS, **(outputs or {})}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+
+        return max(self.latency + random.uniform(-self.jitter, self.jitter), 0.0)
+
+
+def _handler(config: StubLLMConfig):
+
+    class StubLLMHandler(BaseHTTPRequestHandler):
+
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+        def _send(self, status: int, payload: dict) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            if self.path.rstrip("/").endswith("/models"):
+                self._send(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+            else:
+                self._send(404, {"error": {"message": "not found"}})
+
+        def do_POST(self) -> None:
+
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, {"error": {"message": "not found"}})
+                return
+
+            with config._lock:
+                config.requests += 1
+
+            time.sleep(config.delay())
+
+            name, schema, use_tools = _requested_output(body)
+            arguments = json.dumps(canned_answer(schema, config.outputs))
+            prompt_tokens = sum(_estimate_tokens(str(message.get("content", ""))) for message in body.get("messages", []))
+
+            if use_tools:
+                message = {"role": "assistant", "content": None,
+                           "tool_calls": [{"id": "call_stub", "type": "function",
+                                           "function": {"name": name, "arguments": arguments}}]}
+                finish_reason = "tool_calls"
+            else:
+                message = {"role": "assistant", "content": arguments}
+                finish_reason = "stop"
+
+            completion_tokens = _estimate_tokens(arguments)
+
+            self._send(200, {
+                "id": f"chatcmpl-stub-{config.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": {"prompt_tokens": prompt_tokens,
+                          "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            })
+
+    return StubLLMHandler
+
+
+def start_stub_llm(host: str = "127.0.0.1", port: int = 0, config: StubLLMConfig = None) -> tuple:
+    """ Starts the stub server in a background thread; returns the server and its base URL. """
+
+    config = config or StubLLMConfig()
+    server = ThreadingHTTPServer((host, port), _handler(config))
+    server.daemon_threads = True
+
+    threading.Thread(target=server.serve_forever, name="stub-llm", daemon=True).start()
+
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="OpenAI compatible stub LLM server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", default=8099, type=int)
+    parser.add_argument("--latency", default=0.2, type=float, help="Seconds per answer (default: 0.2)")
+    parser.add_argument("--jitter", default=0.0, type=float, help="Random +/- seconds on top of the latency")
+    parser.add_argument("--outputs", default="", help="JSON file with canned outputs per property name")
+    args = parser.parse_args()
+
+    outputs = {}
+    if args.outputs:
+        with open(args.outputs, encoding="utf-8") as file:
+            outputs = json.load(file)
+
+    server, url = start_stub_llm(args.host, args.port, StubLLMConfig(args.latency, args.jitter, outputs))
+    print(f"Stub LLM listening on {url}")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+
+    main()
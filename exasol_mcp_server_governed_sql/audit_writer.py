@@ -0,0 +1,150 @@
+##############################################################
+## Exasol MCP server with Text-to-SQL query option          ##
+## Module: Write-behind queue for the SQL_Audit collection  ##
+##----------------------------------------------------------##
+## Version 1.0.0 DirkB@Exasol : Initial version             ##
+##############################################################
+
+import queue
+import threading
+import time
+
+from exasol_mcp_server_governed_sql.intro import (
+    env,
+    logger,
+    LOGGING,
+    LOGGING_MODE
+)
+from exasol_mcp_server_governed_sql.embedding_cache import embedding_cache
+from exasol_mcp_server_governed_sql.helpers import elapsed_time
+from exasol_mcp_server_governed_sql.metrics import metrics
+from exasol_mcp_server_governed_sql.vectordb import vector_entry_id, vector_store
+
+
+_STOP = object()
+
+
+class AuditWriter:
+    """
+    Persists executed question/SQL combinations in the background. Records are
+    collected in a queue and written in batches, periodically and at shutdown,
+    so the user-facing request does not wait for embeddings and SQLite writes.
+    """
+
+    def __init__(self, flush_interval: float, batch_size: int, max_queued: int) -> None:
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="t2s-audit-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, record: dict) -> None:
+
+        self.start()
+
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            logger.error("VectorDB - Audit queue is full, record dropped.")
+
+    def flush(self) -> None:
+        """ Blocks until all records submitted so far are written. """
+
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def stop(self) -> None:
+
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _run(self) -> None:
+
+        stopping = False
+
+        while not stopping:
+
+            ## Wait for the first record, then collect more until the batch is full or the interval has passed
+
+            batch = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    self._queue.task_done()
+                else:
+                    batch.append(item)
+
+                if stopping or len(batch) >= self.batch_size:
+                    break
+
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    logger.error(f"ChromaDB - Error while writing the audit: {e}")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+
+    def _write_batch(self, batch: list) -> None:
+
+        start_time_chroma = time.time()
+        sql_collection = vector_store.collection("SQL_Audit")
+
+        ## Content-addressed IDs: a known question updates its entry, a new one is added - in one upsert
+
+        records = {vector_entry_id(record['question'], record['db_schema'], record['user']): record for record in batch}
+
+        ## The questions were embedded for the lookups of the request already
+
+        documents = [record['question'] for record in records.values()]
+        embeddings = embedding_cache.embed(documents)
+
+        with metrics.span("vectordb.upsert", collection="SQL_Audit"):
+            sql_collection.upsert(
+                documents=documents,
+                embeddings=embeddings,
+                metadatas=[{"sql": record['sql'],
+                            "execution_date": record['execution_date'],
+                            "execution_ts": record['execution_ts'],
+                            "db_schema": record['db_schema'],
+                            "user": record['user'],
+                            "origin": "text-to-sql",
+                            "schema_fingerprint": record['schema_fingerprint']} for record in records.values()],
+                ids=list(records.keys())
+            )
+
+        self.written += len(batch)
+
+        if LOGGING == 'True' and LOGGING_MODE == 'debug':
+            logger.debug(f"STEP: Vector-DB-SQL audit written: {len(records)} entries")
+
+        elapsed_time(logging=LOGGING, logger=logger, start_time=start_time_chroma, label="Elapsed Time on VectorDB")
+
+
+audit_writer = AuditWriter(flush_interval=float(env['audit_flush_interval']),
+                           batch_size=int(env['audit_batch_size']),
+                           max_queued=int(env['audit_max_queued']))
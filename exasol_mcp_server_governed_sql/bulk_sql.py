@@ -0,0 +1,253 @@
+##############################################################
+## Exasol MCP server with Text-to-SQL query option          ##
+## Module: Bulk import / export of question/SQL pairs       ##
+##----------------------------------------------------------##
+## Version 1.0.0 DirkB@Exasol : Initial version             ##
+##############################################################
+
+import csv
+import json
+import os
+import time
+
+from datetime import datetime
+
+from exasol_mcp_server_governed_sql.intro import (
+    logger,
+    LOGGING,
+)
+from exasol_mcp_server_governed_sql.embedding_cache import embedding_cache
+from exasol_mcp_server_governed_sql.helpers import set_logging_label
+from exasol_mcp_server_governed_sql.metrics import metrics
+from exasol_mcp_server_governed_sql.vectordb import vector_entry_id, vector_store
+
+
+TAUGHT_SQL_COLLECTION = "Questions_SQL_History"
+EXPORT_FIELDS = ["question", "sql_statement", "db_schema", "execution_date"]
+MAX_REPORTED_REJECTS = 100
+
+
+def resolve_bulk_path(file_path: str, directory: str) -> str:
+    """
+    Path of a file named by a client of the MCP tools: relative to the configured directory,
+    neither absolute nor with '..', and not leading out of the directory by symbolic links.
+    """
+
+    if not directory:
+        raise ValueError("Files on the server are disabled, EXA_MCP_BULK_DIRECTORY is not set.")
+
+    if not file_path or os.path.isabs(file_path) or ".." in file_path.replace("\\", "/").split("/"):
+        raise ValueError(f"'{file_path}' is not a relative path within EXA_MCP_BULK_DIRECTORY.")
+
+    base = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(base, file_path))
+
+    if os.path.commonpath([base, path]) != base:
+        raise ValueError(f"'{file_path}' is not a relative path within EXA_MCP_BULK_DIRECTORY.")
+
+    return path
+
+
+def _file_format(path: str) -> str:
+
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def _read_pairs(path: str):
+    """ Yields the line number and the record of a JSONL (the unparsed line) or CSV file (a dictionary). """
+
+    with open(path, newline="", encoding="utf-8") as file:
+        if _file_format(path) == "csv":
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(file, start=1):
+                if line.strip():
+                    yield line_number, line
+
+
+def _field_text(value, name: str) -> str:
+    """ A record field as stripped text; numbers are coerced, nested JSON values are rejected. """
+
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        raise ValueError(f"{name} is not a text value")
+    return str(value).strip()
+
+
+def _pair_record(row, db_schema: str) -> dict:
+    """ The question/SQL pair of one record; raises ValueError for a malformed or incomplete record. """
+
+    if isinstance(row, str):
+        row = json.loads(row)
+    if not isinstance(row, dict):
+        raise ValueError("not a JSON object")
+
+    record = {"question": _field_text(row.get("question"), "question"),
+              "sql_statement": _field_text(row.get("sql_statement") or row.get("sql"), "sql_statement"),
+              "db_schema": _field_text(row.get("db_schema") or db_schema, "db_schema")}
+
+    missing = [name for name, value in record.items() if not value]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+    return record
+
+
+def _progress_file(path: str) -> str:
+
+    return path + ".progress"
+
+
+def _read_progress(path: str) -> int:
+
+    try:
+        with open(_progress_file(path), encoding="utf-8") as file:
+            return int(json.load(file)["rows_done"])
+    except (OSError, ValueError, KeyError):
+        return 0
+
+
+def _write_progress(path: str, rows_done: int) -> None:
+
+    with open(_progress_file(path), "w", encoding="utf-8") as file:
+        json.dump({"rows_done": rows_done}, file)
+
+
+def _write_chunk(collection, chunk: list) -> int:
+    """ Writes the records of the chunk, returns the number of entries written. """
+
+    ## The same question for the same schema maps to the same ID: the last record wins,
+    ## Chroma rejects duplicate IDs within one upsert
+
+    records = {}
+    for record in chunk:
+        entry_id = vector_entry_id(record["question"], record["db_schema"], 'system')
+        records.pop(entry_id, None)
+        records[entry_id] = record
+    chunk = list(records.values())
+
+    ## All documents of the chunk are embedded in one batch, without displacing the cached questions
+
+    execution_date = datetime.now()
+    documents = [record["question"] for record in chunk]
+
+    embeddings = embedding_cache.embed(documents, store=False)
+
+    with metrics.span("vectordb.upsert", collection=TAUGHT_SQL_COLLECTION):
+        collection.upsert(
+            documents=documents,
+            embeddings=embeddings,
+            metadatas=[{"sql": record["sql_statement"],
+                        "execution_date": str(execution_date),
+                        "execution_ts": execution_date.timestamp(),
+                        "db_schema": record["db_schema"],
+                        "user": 'system',
+                        "origin": "learn_sql"} for record in chunk],
+            ids=list(records)
+        )
+
+    return len(chunk)
+
+
+def import_sql_pairs(path: str, db_schema: str = "", chunk_size: int = 256, resume: bool = True) -> dict:
+    """
+    Imports question/SQL pairs from a JSONL or CSV file with the fields 'question', 'sql_statement'
+    (or 'sql') and 'db_schema'; 'db_schema' defaults to the given schema. The number of rows written
+    is kept in '<path>.progress', so an interrupted import continues where it stopped. Malformed or
+    incomplete records are skipped and reported with their line numbers.
+    """
+
+    collection = vector_store.collection(TAUGHT_SQL_COLLECTION)
+
+    rows_done = _read_progress(path) if resume else 0
+    imported, rejected, rejected_lines = 0, 0, []
+    chunk = []
+    start_time = time.time()
+
+    set_logging_label(logging=LOGGING, logger=logger, label=f"##### Bulk import of question/SQL pairs from {path}, starting at row {rows_done}")
+
+    for row_number, (line_number, row) in enumerate(_read_pairs(path)):
+
+        if row_number < rows_done:
+            continue
+
+        try:
+            chunk.append(_pair_record(row, db_schema))
+        except ValueError as e:
+            rejected += 1
+            logger.error(f"Bulk import - line {line_number} rejected: {e}")
+            if len(rejected_lines) < MAX_REPORTED_REJECTS:
+                rejected_lines.append({"line": line_number, "error": str(e)})
+
+        if len(chunk) >= chunk_size:
+            imported += _write_chunk(collection, chunk)
+            chunk = []
+            _write_progress(path, row_number + 1)
+
+    if chunk:
+        imported += _write_chunk(collection, chunk)
+
+    if os.path.exists(_progress_file(path)):
+        os.remove(_progress_file(path))
+
+    elapsed = time.time() - start_time
+    result = {
+        "file": path,
+        "imported": imported,
+        "rejected": rejected,
+        "rejected_lines": rejected_lines,
+        "skipped_by_resume": rows_done,
+        "elapsed_time": elapsed,
+        "rows_per_second": imported / elapsed if elapsed > 0 else 0.0,
+    }
+
+    set_logging_label(logging=LOGGING, logger=logger, label=f"##### Bulk import finished: {result}")
+
+    return result
+
+
+def export_sql_pairs(path: str, db_schema: str = "", page_size: int = 1000) -> dict:
+    """ Streams the taught question/SQL pairs page by page into a JSONL or CSV file. """
+
+    collection = vector_store.collection(TAUGHT_SQL_COLLECTION)
+    where = {'db_schema': db_schema} if db_schema else None
+
+    exported = 0
+    start_time = time.time()
+
+    with open(path, "w", newline="", encoding="utf-8") as file:
+
+        csv_writer = None
+        if _file_format(path) == "csv":
+            csv_writer = csv.DictWriter(file, fieldnames=EXPORT_FIELDS)
+            csv_writer.writeheader()
+
+        while True:
+            page = collection.get(where=where, limit=page_size, offset=exported,
+                                  include=["documents", "metadatas"])
+            if not page['ids']:
+                break
+
+            for document, metadata in zip(page['documents'], page['metadatas']):
+                record = {"question": document,
+                          "sql_statement": metadata.get('sql', ''),
+                          "db_schema": metadata.get('db_schema', ''),
+                          "execution_date": metadata.get('execution_date', '')}
+                if csv_writer is not None:
+                    csv_writer.writerow(record)
+                else:
+                    file.write(json.dumps(record) + "\n")
+
+            exported += len(page['ids'])
+
+    elapsed = time.time() - start_time
+
+    return {
+        "file": path,
+        "exported": exported,
+        "elapsed_time": elapsed,
+        "rows_per_second": exported / elapsed if elapsed > 0 else 0.0,
+    }
@@ -2,24 +2,95 @@
 ## Database / SQL specific functions ##
 #######################################
 
+import asyncio
+import contextlib
+import contextvars
+import functools
+import hashlib
+import re
+import threading
 import time
 
+from concurrent.futures import ThreadPoolExecutor
 from exasol.ai.mcp.server.connection.db_connection import DbConnection
 from sqlglot import exp, parse_one
-from sqlglot.errors import ParseError
+from sqlglot.errors import OptimizeError, ParseError
+from sqlglot.optimizer.normalize_identifiers import normalize_identifiers
+from sqlglot.optimizer.qualify import qualify
+from sqlglot.schema import MappingSchema
 
 from exasol_mcp_server_governed_sql.intro import (
+    env,
     logger,
     LOGGING,
 )
-from exasol_mcp_server_governed_sql.helpers import elapsed_time
+from exasol_mcp_server_governed_sql.helpers import current_db_user, elapsed_time, estimate_tokens, set_logging_label
+from exasol_mcp_server_governed_sql.metrics import metrics
+from exasol_mcp_server_governed_sql.result_cache import ResultCache
+from exasol_mcp_server_governed_sql.schema_cache import SchemaCache
+
+
+schema_cache = SchemaCache(ttl=float(env['schema_cache_ttl']))
+result_cache = ResultCache(ttl=float(env['result_cache_ttl']),
+                           max_entries=int(env['result_cache_max_entries']),
+                           max_bytes=int(env['result_cache_max_bytes']))
+
+
+################################################################
+## Worker pool for blocking calls (Exasol, VectorDB)          ##
+##------------------------------------------------------------##
+## Keeps the event loop of the MCP server free while the      ##
+## database is working on a request.                          ##
+################################################################
+
+db_worker_pool = ThreadPoolExecutor(max_workers=int(env['db_worker_threads']), thread_name_prefix="t2s-db")
+
+
+async def run_db_call(func, *args, **kwargs):
+    """ Runs a blocking database call in the worker pool and awaits its result. """
+
+    loop = asyncio.get_running_loop()
+
+    ## The context goes along, so spans in the worker know the graph node and attempt of the request
+
+    context = contextvars.copy_context()
+
+    return await loop.run_in_executor(db_worker_pool, functools.partial(context.run, func, *args, **kwargs))
+
+
+################################################################
+## One statement at a time per pooled database connection    ##
+##------------------------------------------------------------##
+## DbConnection.execute_query hands the pooled connection of  ##
+## the user back before the result set is fetched; fetching   ##
+## beyond the first chunk and closing the statement still use ##
+## its websocket, which allows one request at a time only.    ##
+################################################################
+
+_connection_locks: dict = {}
+_connection_locks_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def exclusive_connection():
+    """ Holds the connection of the current database user from the execution until the statement is closed. """
+
+    with _connection_locks_lock:
+        lock = _connection_locks.setdefault(current_db_user(env['db_user']).lower(), threading.Lock())
+
+    with lock:
+        yield
 
 
 ############################################################
 ## Retrieve the metadata for the required database schema ##
 #############################################################
 
-def t2s_database_schema(connection: DbConnection, db_schema: str) -> str:
+def _load_schema_metadata(connection: DbConnection, db_schema: str) -> dict:
+
+    ## Same name as in the key of the schema cache: unquoted schema names are upper case in Exasol
+
+    schema_name = db_schema.upper().replace("'", "''")
 
     metadata_query = f"""
         SELECT 
@@ -31,34 +102,220 @@ def t2s_database_schema(connection: DbConnection, db_schema: str) -> str:
         FROM 
             "SYS"."EXA_ALL_COLUMNS"
         WHERE
-            COLUMN_SCHEMA = '{db_schema}'
+            COLUMN_SCHEMA = '{schema_name}'
         ORDER BY 
             COLUMN_SCHEMA, COLUMN_TABLE;
     """
 
     start_time_exa_query = time.time()
-    stmt = connection.execute_query(metadata_query,snapshot=True)
+
+    with metrics.span("exasol.catalog"), exclusive_connection():
+        stmt = connection.execute_query(metadata_query,snapshot=True)
+
+        try:
+            columns = [
+                (row['COLUMN_TABLE'], row['COLUMN_NAME'], row['COLUMN_TYPE'], row['COLUMN_COMMENT'])
+                for row in stmt
+            ]
+        finally:
+            stmt.close()
     elapsed_time(logging=LOGGING, logger=logger, start_time=start_time_exa_query, label="Elapsed Time on Exasol-DB - Retrieve Database Schema")
 
-    schema_metadata = ""
-    table, old_table = "", ""
+    ## The fingerprint changes with any table, column, type or comment of the schema
+
+    fingerprint = hashlib.sha256(repr(columns).encode("utf-8")).hexdigest()
+
+    return {'columns': columns, 'fingerprint': fingerprint}
+
+
+def schema_cache_key(db_schema: str) -> tuple:
+    """
+    Key of the schema metadata in the schema cache. EXA_ALL_COLUMNS only lists what the user
+    of the connection may access; with OAuth, that is the user of the request.
+    """
+
+    return db_schema.upper(), current_db_user(env['db_user']).lower()
+
+
+def t2s_schema_metadata(connection: DbConnection, db_schema: str) -> list:
+    """
+    Returns the columns of the schema as (table, column, type, comment) tuples,
+    served from the schema cache whenever possible.
+    """
+
+    metadata = schema_cache.get_or_load(schema_cache_key(db_schema), lambda: _load_schema_metadata(connection, db_schema))
+
+    return metadata['columns']
+
+
+def t2s_schema_fingerprint(connection: DbConnection, db_schema: str) -> str:
+    """ Returns a hash over the metadata of the schema, to detect changes of the schema. """
+
+    metadata = schema_cache.get_or_load(schema_cache_key(db_schema), lambda: _load_schema_metadata(connection, db_schema))
+
+    return metadata['fingerprint']
+
+
+####################################################################
+## Serialize the schema metadata for the prompts                  ##
+##----------------------------------------------------------------##
+## 'compact': one line per table, short types, no empty comments  ##
+## 'verbose': one line per column, as in earlier versions         ##
+####################################################################
+
+SHORT_TYPES = (
+    (" UTF8", ""),
+    (" ASCII", ""),
+    ("VARCHAR(2000000)", "VARCHAR"),
+    ("DECIMAL", "DEC"),
+    ("DOUBLE PRECISION", "DOUBLE"),
+    ("BOOLEAN", "BOOL"),
+    (" WITH LOCAL TIME ZONE", " LTZ"),
+)
+
+QUESTION_TERM = re.compile(r"[A-Za-z0-9]{3,}")
+
+
+def _short_type(column_type: str) -> str:
+
+    for long_name, short_name in SHORT_TYPES:
+        column_type = column_type.replace(long_name, short_name)
+
+    return column_type
+
+
+def _verbose_table(db_schema: str, table: str, columns: list) -> str:
+
+    lines = [f"\n Table '{db_schema}.{table}': \n Columns: \n"]
+    for column, column_type, comment in columns:
+        lines.append("\t - " + column + ": " + column_type + "  ::  " + (comment or "No comment") + "\n")
+
+    return "".join(lines)
+
+
+def _compact_table(db_schema: str, table: str, columns: list) -> str:
+
+    parts = [f'{column} {_short_type(column_type)}' + (f' "{comment}"' if comment else "")
+             for column, column_type, comment in columns]
+
+    return f"{db_schema}.{table}(" + ", ".join(parts) + ")\n"
+
+
+def _words(text: str) -> set:
+    """ Upper case words of a name or text, a trailing plural 'S' removed, so CUSTOMER matches CUSTOMERS. """
+
+    words = {word.upper() for word in QUESTION_TERM.findall((text or "").replace("_", " "))}
+
+    return {word[:-1] if word.endswith("S") and len(word) > 3 else word for word in words}
+
+
+def _table_priority(table: str, columns: list, terms: set) -> int:
+    """ Terms of the question in the table name count most, then in column names and comments. """
+
+    score = 3 * len(terms & _words(table))
+    for column, column_type, comment in columns:
+        score += 2 * len(terms & _words(column)) + len(terms & _words(comment))
+
+    return score
+
+
+def t2s_database_schema(connection: DbConnection, db_schema: str, tables: set = None, question: str = "") -> str:
+    """
+    Schema metadata for the prompts. Given (upper case) table names, e.g. of a failing statement,
+    narrow it to the known ones among them plus the tables related to the question; to all tables,
+    if there are none. Beyond EXA_MCP_SCHEMA_TOKEN_BUDGET tokens, the given tables are always kept,
+    then the tables most related to the question.
+    """
+
+    grouped: dict = {}
+    for table, column, column_type, comment in t2s_schema_metadata(connection=connection, db_schema=db_schema):
+        grouped.setdefault(table, []).append((column, column_type, comment))
+
+    terms = _words(question)
+    priority = {table: _table_priority(table, columns, terms) for table, columns in grouped.items()}
+    required = {table for table in grouped if tables and table.upper() in tables}
+
+    ## A statement referencing unknown tables only (e.g. a misspelled name) must not leave the prompt without schema
+
+    if tables:
+        narrowed = {table: columns for table, columns in grouped.items() if table in required or priority[table] > 0}
+        grouped = narrowed or grouped
+
+    render_table = _verbose_table if env['schema_format'].lower() == "verbose" else _compact_table
+    rendered = {table: render_table(db_schema, table, columns) for table, columns in grouped.items()}
+    table_tokens = {table: estimate_tokens(text) for table, text in rendered.items()}
 
-    for row in stmt:
+    full_tokens = sum(table_tokens.values())
+    budget = int(env['schema_token_budget'])
+    selected = set(rendered)
 
-        db_schema = row['COLUMN_SCHEMA']
-        table = row['COLUMN_TABLE']
-        if table != old_table:
-            schema_metadata += f"\n Table '{db_schema}.{table}': \n Columns: \n"
+    if 0 < budget < full_tokens:
 
-        if row['COLUMN_COMMENT'] is None:
-            comment = "No comment"
-        else:
-            comment = row['COLUMN_COMMENT']
+        ## Given tables first, then highest priority, the order of the schema on equal priority;
+        ## the first table is always kept
 
-        schema_metadata += "\t - " + row['COLUMN_NAME'] + ": " + row['COLUMN_TYPE'] + "  ::  " + comment + "\n"
-        old_table = table
+        ranked = sorted(rendered, key=lambda table: (table not in required, -priority[table]))
+
+        selected, tokens = set(), 0
+        for table in ranked:
+            if selected and table not in required and tokens + table_tokens[table] > budget:
+                continue
+            selected.add(table)
+            tokens += table_tokens[table]
+
+    set_logging_label(logging=LOGGING, logger=logger,
+                      label=f"Schema for the prompt ({env['schema_format']}): {len(selected)} of {len(rendered)} tables, "
+                            f"~{sum(table_tokens[table] for table in selected)} of ~{full_tokens} tokens")
+
+    return "".join(text for table, text in rendered.items() if table in selected)
+
+
+def invalidate_schema_cache(db_schema: str = "") -> dict:
+    """ Drops the cached metadata and query results of one schema, or of all schemas if none is given. """
+
+    schema_cache.invalidate(db_schema)
+    result_cache.invalidate(db_schema)
+
+    return schema_cache.stats()
+
+##################################################################
+## Fetch a result set in batches, keeping a bounded preview only ##
+##################################################################
+
+FETCH_BATCH_SIZE = 1000
+
+
+def fetch_limited(statement, max_rows: int, max_bytes: int) -> tuple:
+    """
+    Fetches rows until either 'max_rows' rows or roughly 'max_bytes' bytes are reached
+    and closes the statement. Returns the rows as tuples and a flag for truncation.
+    """
+
+    rows = []
+    size = 0
+    truncated = False
+
+    try:
+        while not truncated:
+
+            batch = statement.fetchmany(FETCH_BATCH_SIZE)
+            if not batch:
+                break
+
+            for row in batch:
+                row = tuple(row.values()) if isinstance(row, dict) else tuple(row)
+                size += len(repr(row))
+
+                if len(rows) >= max_rows or size > max_bytes:
+                    truncated = True
+                    break
+
+                rows.append(row)
+    finally:
+        statement.close()
+
+    return rows, truncated
 
-    return schema_metadata
 
 #######################################################
 ## Is the execution of the SQL statement permissible ##
@@ -66,16 +323,143 @@ def t2s_database_schema(connection: DbConnection, db_schema: str) -> str:
 ## Currently, only 'SELECT' statements are permitted ##
 #######################################################
 
+def parse_sql(query: str):
+    """ Parses the query in the Exasol dialect, returns None if it cannot be parsed. """
+
+    try:
+        return parse_one(query, read="exasol")
+    except ParseError:
+        return None
+
+
+def canonical_sql(ast) -> str:
+    """
+    The parsed query in one canonical form: keywords, whitespace and the case of unquoted
+    identifiers do not matter, so equivalent statements of the LLM map to the same text.
+    """
+
+    return normalize_identifiers(ast.copy(), dialect="exasol").sql(dialect="exasol")
+
+
+def result_cache_key(ast, db_schema: str, db_user: str):
+    """ Key of the query result in the result cache, None if the query cannot be parsed. """
+
+    if ast is None:
+        return None
+
+    return canonical_sql(ast), db_schema.upper(), db_user.lower()
+
+
+def is_allowed_query(ast) -> bool:
+    """
+    Verifies that the parsed query is a valid SELECT query.
+    Declines any other types of statements including the SELECT INTO.
+    """
+
+    if isinstance(ast, exp.Select):
+        return "into" not in ast.args
+    return False
+
+
 def get_sql_query_type(query: str) -> bool:
     """
     Verifies that the query is a valid SELECT query.
     Declines any other types of statements including the SELECT INTO.
     """
 
+    return is_allowed_query(parse_sql(query))
+
+
+def get_sql_tables(ast) -> set:
+    """ Returns the upper case names of all tables referenced by the parsed query, empty if there is none. """
+
+    if ast is None:
+        return set()
+
+    return {table.name.upper() for table in ast.find_all(exp.Table) if table.name}
+
+
+###########################################################################
+## Validate the parsed SQL statement against the cached schema metadata ##
+##-----------------------------------------------------------------------##
+## Only unknown tables reject a statement. Columns are checked for the   ##
+## log only: sqlglot does not know every Exasol construct, a wrong       ##
+## rejection would cost all attempts of a valid statement.               ##
+###########################################################################
+
+## Resolved by Exasol itself, never columns of a table
+
+EXASOL_PSEUDO_COLUMNS = frozenset({
+    "SYSDATE", "SYSTIMESTAMP", "CURRENT_DATE", "CURRENT_TIMESTAMP", "LOCALTIMESTAMP",
+    "CURRENT_USER", "USER", "CURRENT_SCHEMA", "CURRENT_SESSION", "CURRENT_STATEMENT",
+    "DBTIMEZONE", "SESSIONTIMEZONE", "ROWNUM", "ROWID", "LEVEL",
+    "CONNECT_BY_ISCYCLE", "CONNECT_BY_ISLEAF",
+})
+
+
+def _unresolved_columns(ast, db_schema: str, tables: dict) -> list:
+    """ Columns sqlglot cannot resolve against the schema, compared case-insensitively. """
+
+    checked = ast.copy()
+
+    for column in list(checked.find_all(exp.Column)):
+        if column.table.upper() == "LOCAL" or (not column.table and column.name.upper() in EXASOL_PSEUDO_COLUMNS):
+            column.replace(exp.null())
+
+    ## Exasol folds unquoted names to upper case, sqlglot to lower case: compare without quotes
+
+    for identifier in checked.find_all(exp.Identifier):
+        identifier.set("quoted", False)
+
     try:
-        ast = parse_one(query, read="exasol")
-        if isinstance(ast, exp.Select):
-            return "into" not in ast.args
-        return False
-    except ParseError:
-        return False
\ No newline at end of file
+        qualify(checked,
+                schema=MappingSchema({db_schema.upper(): tables}, dialect="exasol"),
+                db=db_schema.upper(),
+                dialect="exasol",
+                validate_qualify_columns=True,
+                identify=False)
+    except OptimizeError as e:
+        return [str(e)]
+    except Exception as e:
+        logger.error(f"SQL validation of columns skipped: {e}")
+
+    return []
+
+
+def validate_sql(ast, db_schema: str, columns: list) -> list:
+    """
+    Checks the tables of the parsed query against the metadata of the schema and returns the
+    errors found, empty if the query is fine or cannot be checked. Unresolved columns are logged.
+    """
+
+    tables: dict = {}
+    for table, column, column_type, comment in columns:
+        ## The type is not checked, the base type (without length or charset) is sufficient
+        tables.setdefault(table.upper(), {})[column.upper()] = column_type.split("(")[0].split(" ")[0]
+
+    cte_names = {cte.alias_or_name.upper() for cte in ast.find_all(exp.CTE)}
+    errors = []
+    foreign_tables = False
+
+    for table in ast.find_all(exp.Table):
+
+        name = table.name.upper()
+        if not name or (not table.db and name in cte_names):
+            continue
+
+        if table.db and table.db.upper() != db_schema.upper():
+            foreign_tables = True
+            continue
+
+        if name not in tables:
+            errors.append(f"Table {db_schema.upper()}.{name} does not exist.")
+
+    ## Columns can only be resolved, if all tables are known
+
+    if errors or foreign_tables:
+        return errors
+
+    for issue in _unresolved_columns(ast, db_schema, tables):
+        logger.warning(f"SQL validation (not enforced): {issue}")
+
+    return errors
@@ -0,0 +1,124 @@
+##############################################################
+## Exasol MCP server with Text-to-SQL query option          ##
+## Module: In-process LRU cache for question embeddings     ##
+##----------------------------------------------------------##
+## Version 1.0.0 DirkB@Exasol : Initial version             ##
+##############################################################
+
+import numpy as np
+import threading
+
+from collections import OrderedDict
+
+from exasol_mcp_server_governed_sql.intro import env
+from exasol_mcp_server_governed_sql.metrics import metrics
+from exasol_mcp_server_governed_sql.vectordb import normalize_question
+
+
+class EmbeddingCache:
+    """
+    Embeds texts with the embedding function of the VectorDB collections and keeps the
+    vectors of the last 'max_entries' texts, keyed by model and normalized text. A request
+    embeds its question once, even though it queries and writes several collections.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._embedding_function = None
+        self._lock = threading.Lock()
+
+    @property
+    def embedding_function(self):
+
+        ## Same default model as the collections, which are created without an explicit function
+
+        if self._embedding_function is None:
+            from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+            self._embedding_function = DefaultEmbeddingFunction()
+
+        return self._embedding_function
+
+    @property
+    def model(self) -> str:
+
+        embedding_function = self.embedding_function
+        try:
+            return embedding_function.name()
+        except Exception:
+            return type(embedding_function).__name__
+
+    def _store(self, key: tuple, vector: np.ndarray) -> None:
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+
+        self._entries[key] = vector
+        self._bytes += vector.nbytes + len(key[1])
+
+        while len(self._entries) > self.max_entries:
+            old_key, old_vector = self._entries.popitem(last=False)
+            self._bytes -= old_vector.nbytes + len(old_key[1])
+
+    def embed(self, texts: list, store: bool = True) -> list:
+        """
+        Returns one vector per text. Texts not in the cache are embedded in one batch;
+        with store=False (e.g. bulk imports) they are not added, to keep the hot entries.
+        """
+
+        model = self.model
+        keys = [(model, normalize_question(text)) for text in texts]
+        vectors = [None] * len(keys)
+
+        with self._lock:
+            for position, key in enumerate(keys):
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    vectors[position] = vector
+                    self.hits += 1
+                else:
+                    self.misses += 1
+
+        missing = list(dict.fromkeys(key for key, vector in zip(keys, vectors) if vector is None))
+
+        if missing:
+            with metrics.span("embedding", model=model):
+                embedded = dict(zip(missing, (np.asarray(vector, dtype=np.float32)
+                                              for vector in self.embedding_function([key[1] for key in missing]))))
+
+            with self._lock:
+                for position, key in enumerate(keys):
+                    if vectors[position] is None:
+                        vectors[position] = embedded[key]
+                if store and self.max_entries > 0:
+                    for key, vector in embedded.items():
+                        self._store(key, vector)
+
+        return vectors
+
+    def clear(self) -> None:
+
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "memory_bytes": self._bytes,
+            }
+
+
+embedding_cache = EmbeddingCache(max_entries=int(env['embedding_cache_size']))
@@ -0,0 +1,88 @@
+##############################################################
+## Exasol MCP server with Text-to-SQL query option          ##
+## Module: Few-shot examples for the translation prompt     ##
+##----------------------------------------------------------##
+## Version 1.0.0 DirkB@Exasol : Initial version             ##
+##############################################################
+
+from exasol_mcp_server_governed_sql.embedding_cache import embedding_cache
+from exasol_mcp_server_governed_sql.helpers import estimate_tokens
+from exasol_mcp_server_governed_sql.intro import logger
+from exasol_mcp_server_governed_sql.metrics import metrics
+from exasol_mcp_server_governed_sql.vectordb import vector_store
+
+
+##
+## Taught examples come first on equal distance, they are curated by hand
+##
+
+EXAMPLE_COLLECTIONS = ("Questions_SQL_History", "SQL_Audit")
+
+
+def retrieve_examples(question: str, db_schema: str, top_k: int, max_distance: float, token_budget: int) -> list:
+    """
+    Returns up to 'top_k' question/SQL examples of the schema from the taught and the audited
+    SQL statements, nearest first, as long as they fit into the token budget.
+    """
+
+    candidates = []
+
+    ## Without an embedding (e.g. the model cannot be loaded), the translation goes on without examples
+
+    try:
+        question_embeddings = embedding_cache.embed([question])
+    except Exception as e:
+        logger.error(f"Embedding - Error: {e}")
+        return []
+
+    for priority, name in enumerate(EXAMPLE_COLLECTIONS):
+        try:
+            with metrics.span("vectordb.query", collection=name):
+                tmp = vector_store.collection(name).query(query_embeddings=question_embeddings, n_results=top_k,
+                                                          where={'db_schema': db_schema},
+                                                          include=["distances", "documents", "metadatas"])
+        except Exception as e:
+            logger.error(f"ChromaDB - Error: {e}")
+            continue
+
+        for document, metadata, distance in zip(tmp['documents'][0], tmp['metadatas'][0], tmp['distances'][0]):
+            if float(distance) <= max_distance:
+                candidates.append({"question": document,
+                                   "sql": metadata['sql'],
+                                   "distance": float(distance),
+                                   "priority": priority})
+
+    candidates.sort(key=lambda example: (example['distance'], example['priority']))
+
+    examples, known_sql, tokens = [], set(), 0
+
+    for example in candidates:
+
+        sql_key = " ".join(example['sql'].upper().split())
+        if sql_key in known_sql:
+            continue
+
+        example_tokens = estimate_tokens(example['question']) + estimate_tokens(example['sql'])
+        if tokens + example_tokens > token_budget:
+            continue
+
+        examples.append(example)
+        known_sql.add(sql_key)
+        tokens += example_tokens
+
+        if len(examples) >= top_k:
+            break
+
+    return examples
+
+
+def format_examples(examples: list) -> str:
+
+    if not examples:
+        return ""
+
+    parts = ["\n\nFor similar natural language questions the following SQL statements are known to work:\n"]
+    for example in examples:
+        parts.append(f"\nQuestion: {example['question']}\nSQL: {example['sql']}\n")
+
+    return "".join(parts)
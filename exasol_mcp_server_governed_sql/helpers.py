@@ -30,6 +30,13 @@ def get_environment() -> dict:
             "llm_server_result_rendering": os.getenv("EXA_MCP_LLM_RENDERING"),
             "vectordb_persistent_storage": os.getenv("EXA_MCP_VECTORDB_FILE"),
             "vectordb_similarity_distance": os.getenv("EXA_MCP_VECTORDB_SIMILARITY_DISTANCE"),
+            "fewshot_top_k": os.getenv("EXA_MCP_FEWSHOT_TOP_K", "3"),
+            "fewshot_token_budget": os.getenv("EXA_MCP_FEWSHOT_TOKEN_BUDGET", "1000"),
+            "vectordb_reuse_distance": os.getenv("EXA_MCP_VECTORDB_REUSE_DISTANCE", "0"),
+            "embedding_cache_size": os.getenv("EXA_MCP_EMBEDDING_CACHE_SIZE", "10000"),
+            "audit_flush_interval": os.getenv("EXA_MCP_AUDIT_FLUSH_INTERVAL", "2"),
+            "audit_batch_size": os.getenv("EXA_MCP_AUDIT_BATCH_SIZE", "64"),
+            "audit_max_queued": os.getenv("EXA_MCP_AUDIT_MAX_QUEUED", "10000"),
             "logger": os.getenv("EXA_MCP_LOGGER"),
             "logger_mode": os.getenv("EXA_MCP_LOGGER_MODE").lower(),
             "logger_destination": os.getenv("EXA_MCP_LOGGER_FILE"),
@@ -38,10 +45,30 @@ def get_environment() -> dict:
             "temperature_query_rewrite": os.getenv("EXA_MCP_LLM_TEMPERATURE_QUERY_REWRITE"),
             "temperature_rendering": os.getenv("EXA_MCP_LLM_TEMPERATURE_RENDERING"),
             "temperature_info": os.getenv("EXA_MCP_LLM_TEMPERATURE_INFO"),
+            "llm_max_connections": os.getenv("EXA_MCP_LLM_MAX_CONNECTIONS", "20"),
+            "llm_keepalive_expiry": os.getenv("EXA_MCP_LLM_KEEPALIVE_EXPIRY", "60"),
+            "db_worker_threads": os.getenv("EXA_MCP_DB_WORKER_THREADS", "16"),
+            "max_concurrent_requests": os.getenv("EXA_MCP_MAX_CONCURRENT_REQUESTS", "4"),
+            "max_queued_requests": os.getenv("EXA_MCP_MAX_QUEUED_REQUESTS", "32"),
+            "result_max_rows": os.getenv("EXA_MCP_RESULT_MAX_ROWS", "1000"),
+            "result_max_bytes": os.getenv("EXA_MCP_RESULT_MAX_BYTES", "1048576"),
+            "result_rendering": os.getenv("EXA_MCP_RESULT_RENDERING", "markdown"),
+            "info_messages": os.getenv("EXA_MCP_INFO_MESSAGES", "template"),
+            "relevance_check": os.getenv("EXA_MCP_RELEVANCE_CHECK", "llm"),
+            "relevance_embedding_threshold": os.getenv("EXA_MCP_RELEVANCE_EMBEDDING_THRESHOLD", "0.35"),
+            "retry_strategy": os.getenv("EXA_MCP_RETRY_STRATEGY", "repair"),
+            "validate_sql": os.getenv("EXA_MCP_VALIDATE_SQL", "True"),
+            "batch_concurrency": os.getenv("EXA_MCP_BATCH_CONCURRENCY", "4"),
+            "schema_cache_ttl": os.getenv("EXA_MCP_SCHEMA_CACHE_TTL", "300"),
+            "schema_format": os.getenv("EXA_MCP_SCHEMA_FORMAT", "compact"),
+            "schema_token_budget": os.getenv("EXA_MCP_SCHEMA_TOKEN_BUDGET", "8000"),
+            "result_cache_ttl": os.getenv("EXA_MCP_RESULT_CACHE_TTL", "60"),
+            "result_cache_max_entries": os.getenv("EXA_MCP_RESULT_CACHE_MAX_ENTRIES", "256"),
+            "result_cache_max_bytes": os.getenv("EXA_MCP_RESULT_CACHE_MAX_BYTES", "67108864"),
+            "username_claim": os.getenv("EXA_USERNAME_CLAIM", ""),
+            "bulk_directory": os.getenv("EXA_MCP_BULK_DIRECTORY", ""),
         }
 
-    print(env)
-
     return env
 
 
@@ -56,6 +83,42 @@ def elapsed_time(logging: bool, logger: loguru.logger, start_time, label) -> Non
         logger.info(f"{label}: {et:.2f} seconds")
 
 
+######################################################################
+## The database user of the request: with OAuth, the connection     ##
+## impersonates the user of the access token (EXA_USERNAME_CLAIM)   ##
+######################################################################
+
+def current_db_user(default_user: str) -> str:
+
+    ## Imported here, the env of intro is built by get_environment above
+
+    from exasol_mcp_server_governed_sql.intro import env
+
+    claim = env['username_claim']
+
+    if claim:
+        try:
+            from fastmcp.server.dependencies import get_access_token
+
+            token = get_access_token()
+            user = (getattr(token, "claims", None) or {}).get(claim) if token is not None else None
+            if user:
+                return str(user)
+        except Exception:
+            pass
+
+    return default_user or ""
+
+
+####################################################
+## A rough token count of prompt parts (~4 chars) ##
+####################################################
+
+def estimate_tokens(text: str) -> int:
+
+    return len(text) // 4 + 1
+
+
 #################################
 ## A tiny Helper to set labels ##
 #################################
@@ -5,7 +5,42 @@ from pydantic import BaseModel, Field
 
 from exasol_mcp_server_governed_sql.intro import env, GraphState,logger, LOGGING
 from exasol_mcp_server_governed_sql.helpers import set_logging_label
-from exasol_mcp_server_governed_sql.llm import invoke_llm
+from exasol_mcp_server_governed_sql.llm import ainvoke_llm
+
+
+###################################################################
+## Local message templates, unless EXA_MCP_INFO_MESSAGES is 'llm' ##
+###################################################################
+
+INFO_TEMPLATES = {
+    "query_not_relevant": (
+        "The question \"{question}\" does not fit to the database schema {db_schema}. "
+        "Please rephrase the question or name the database schema it refers to."
+    ),
+    "unable_query_type": (
+        "The SQL statement created for the question \"{question}\" is not allowed. "
+        "Only read-only queries (SELECT) are executed on the database schema {db_schema}."
+    ),
+    "unable_create_sql": (
+        "No valid SQL statement could be created for the question \"{question}\" on the "
+        "database schema {db_schema} within {num_of_attempts} attempts. "
+        "Last error of the database: {sql_error}"
+    ),
+}
+
+
+def use_info_templates() -> bool:
+
+    return env['info_messages'].lower() != "llm"
+
+
+def render_info_template(name: str, state: GraphState) -> str:
+
+    return INFO_TEMPLATES[name].format(question=state.get('question', ''),
+                                       db_schema=state.get('db_schema', ''),
+                                       num_of_attempts=state.get('num_of_attempts', 0),
+                                       sql_error=state.get('sql_error', 'None'))
+
 
 ###############################################################################################
 ## Inform user that query seems to be not relevant / does not fit to desired database schema ##
@@ -16,20 +51,24 @@ class BadRelevanceAnswer(BaseModel):
         description="Informing the user about question and database schema mismatch"
     )
 
-def t2s_info_query_not_relevant(state: GraphState):
+async def t2s_info_query_not_relevant(state: GraphState):
 
     set_logging_label(logging=LOGGING, logger=logger, label="----- t2s_info_query_not_relevant -----")
 
+    if use_info_templates():
+        state["info"] = render_info_template("query_not_relevant", state)
+        return state
+
     system_prompt = "You are a educative assistant who responds in a strict manner!"
     info_message = "The human question and the database schema do not fit together!"
 
-    result = invoke_llm(base=env["llm_server_url"],
-                        api=env["llm_server_api_token"],
-                        model=env["llm_server_model_check"],
-                        temperature=env['temperature_info'],
-                        prompt=system_prompt,
-                        query=info_message,
-                        output=BadRelevanceAnswer)
+    result = await ainvoke_llm(base=env["llm_server_url"],
+                               api=env["llm_server_api_token"],
+                               model=env["llm_server_model_check"],
+                               temperature=env['temperature_info'],
+                               prompt=system_prompt,
+                               query=info_message,
+                               output=BadRelevanceAnswer)
 
     state["info"] = result.info_about_relevance
 
@@ -45,20 +84,24 @@ class SQLTypeNotAllowed(BaseModel):
         description="Informing the user that the type of the SQL statement is not allowed."
     )
 
-def t2s_info_unable_query_type(state: GraphState):
+async def t2s_info_unable_query_type(state: GraphState):
 
     set_logging_label(logging=LOGGING, logger=logger, label="----- t2s_info_unable_query_type -----")
 
+    if use_info_templates():
+        state["info"] = render_info_template("unable_query_type", state)
+        return state
+
     system_prompt = "You are a educative assistant who responds in a strict manner"
     info_message = "Explain: The SQL query type is not allowed."
 
-    result = invoke_llm(base=env["llm_server_url"],
-                        api=env["llm_server_api_token"],
-                        model=env["llm_server_model_check"],
-                        temperature=env['temperature_info'],
-                        prompt=system_prompt,
-                        query=info_message,
-                        output=SQLTypeNotAllowed)
+    result = await ainvoke_llm(base=env["llm_server_url"],
+                               api=env["llm_server_api_token"],
+                               model=env["llm_server_model_check"],
+                               temperature=env['temperature_info'],
+                               prompt=system_prompt,
+                               query=info_message,
+                               output=SQLTypeNotAllowed)
 
     state["info"] = result.info_about_bad_sql_type
 
@@ -73,20 +116,24 @@ class UnableCreateSQL(BaseModel):
         description="Informing the user that the text-to-sql tool cannot create a valid SQL statement"
     )
 
-def t2s_info_unable_create_sql(state: GraphState):
+async def t2s_info_unable_create_sql(state: GraphState):
 
     set_logging_label(logging=LOGGING, logger=logger, label="----- t2s_info_unable_create_sql -----")
 
+    if use_info_templates():
+        state["info"] = render_info_template("unable_create_sql", state)
+        return state
+
     system_prompt = "You are a educative assistant who responds in a strict manner."
     info_message = "Text-to-SQL tool cannot create a valid SQL statement, explain the SQL dialect does not work."
 
-    result = invoke_llm(base=env["llm_server_url"],
-                        api=env["llm_server_api_token"],
-                        model=env["llm_server_model_check"],
-                        temperature=env['temperature_info'],
-                        prompt=system_prompt,
-                        query=info_message,
-                        output=UnableCreateSQL)
+    result = await ainvoke_llm(base=env["llm_server_url"],
+                               api=env["llm_server_api_token"],
+                               model=env["llm_server_model_check"],
+                               temperature=env['temperature_info'],
+                               prompt=system_prompt,
+                               query=info_message,
+                               output=UnableCreateSQL)
 
     state["info"] = result.info_unable_create_sql
 
@@ -19,8 +19,12 @@ class GraphState(TypedDict):
     connection: DbConnection      # The database connection with Impersonation
     db_schema: str                # The database schema to be used
     sql_statement: str            # The generated SQL statement
-    query_num_rows: int           # The number of rows returned
-    query_result: str             # The result of the generated SQL statement
+    sql_ast: object               # The parsed SQL statement (sqlglot), None if it cannot be parsed
+    query_num_rows: int           # The number of rows of the full result set
+    query_columns: list           # The column names of the result set
+    query_rows: list              # The fetched rows (preview), limited in rows and bytes
+    query_truncated: bool         # The preview does not contain all rows of the result set
+    query_result: str             # The result of the generated SQL statement as text (LLM rendering only)
     display_result: str           # The transformed result into a visual version
     num_of_attempts: int          # The number of attempts to generate a valid SQL statement
     is_allowed: str               # Is the generated SQL statement allowed (READ-ONLY, currently)
@@ -28,6 +32,13 @@ class GraphState(TypedDict):
     sql_is_valid: str             # SQL statements accepted by the Exasol database
     sql_error: str                # The SQL error returned by the Exasol database, if any
     info: str                     # Additional INFO field
+    sql_reused: str               # SQL statement taken over from a known question instead of the LLM
+    sql_origin: str               # Origin of the current SQL statement: 'reuse', 'translation' or 'repair'
+    attempt_history: list         # Origin and outcome of every executed attempt
+    queue_depth: int              # Requests waiting ahead of this one when it was scheduled
+    queue_wait_time: float        # Seconds spent waiting for a free slot of the scheduler
+    use_result_cache: bool        # The result may be served from the result cache (per call opt-out)
+    result_cache_hit: bool        # The result was served from the result cache, not by Exasol
 
 
 ########################
@@ -37,8 +48,22 @@ class GraphState(TypedDict):
 LOGGING = env['logger']
 LOGGING_MODE = env['logger_mode']
 
-logger.add(sys.stdout, colorize=True, format="<green>{time}</green> <level>{message}</level>", filter="my_module", level="INFO")
-logger.add(env['logger_destination'])
+_logging_ready = False
+
+
+def setup_logging() -> None:
+    """ Adds the log sinks once; called by the entry points, not on import. """
+
+    global _logging_ready
+
+    if _logging_ready:
+        return
+
+    logger.add(sys.stdout, colorize=True, format="<green>{time}</green> <level>{message}</level>", filter="my_module", level="INFO")
+    if env['logger_destination']:
+        logger.add(env['logger_destination'])
+
+    _logging_ready = True
 
 
 from typing import Optional
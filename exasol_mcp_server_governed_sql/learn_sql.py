@@ -1,6 +1,5 @@
 
 
-import chromadb
 import time
 
 from datetime import datetime
@@ -12,7 +11,10 @@ from exasol_mcp_server_governed_sql.intro import (
     LOGGING_MODE
 )
 
+from exasol_mcp_server_governed_sql.embedding_cache import embedding_cache
 from exasol_mcp_server_governed_sql.helpers import elapsed_time
+from exasol_mcp_server_governed_sql.metrics import metrics
+from exasol_mcp_server_governed_sql.vectordb import vector_entry_id, vector_store
 
 
 def learn_sql(question: str, sql_statement: str, db_schema: str) -> list:
@@ -22,23 +24,27 @@ def learn_sql(question: str, sql_statement: str, db_schema: str) -> list:
     if LOGGING == 'True' and LOGGING_MODE == 'debug':
         logger.debug("STEP: Storing pre-define combination of Question and SQL into VectorDB.")
 
-    vectordb_client = chromadb.PersistentClient(path=env['vectordb_persistent_storage'])
-    sql_collection = vectordb_client.get_or_create_collection(name="Questions_SQL_History")
+    sql_collection = vector_store.collection("Questions_SQL_History")
 
-    ## Check, if query exists in VectorDB
+    ## The same question for the same schema replaces the stored SQL statement
 
     start_time_chroma = time.time()
-
-    new_idx = sql_collection.count() + 1
-    sql_collection.add(
-        documents=[ question ],
-        metadatas=[{"sql": sql_statement,
-                    "execution_date": str(datetime.now()),
-                    "db_schema": db_schema,
-                    "user": 'system',
-                    "origin": "learn_sql"}],
-        ids=[f"{new_idx}"]
-    )
+    execution_date = datetime.now()
+
+    embeddings = embedding_cache.embed([ question ])
+
+    with metrics.span("vectordb.upsert", collection="Questions_SQL_History"):
+        sql_collection.upsert(
+            documents=[ question ],
+            embeddings=embeddings,
+            metadatas=[{"sql": sql_statement,
+                        "execution_date": str(execution_date),
+                        "execution_ts": execution_date.timestamp(),
+                        "db_schema": db_schema,
+                        "user": 'system',
+                        "origin": "learn_sql"}],
+            ids=[vector_entry_id(question, db_schema, 'system')]
+        )
     if LOGGING == 'True' and LOGGING_MODE == 'debug':
         logger.debug("STEP: Vector-DB-SQL[Learn SQL] with Question/SQL written")
 
@@ -8,28 +8,170 @@ import os
 os.environ["LANGCHAIN_TELEMETRY"] = "false"
 os.environ["LANGCHAIN_TRACING_V2"] = "false"
 
+import httpx
+import threading
+
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel
 
+from exasol_mcp_server_governed_sql.intro import env, logger
+from exasol_mcp_server_governed_sql.metrics import metrics
+
+
+##
+## The system prompt is passed as a variable, so one template serves every call
+##
+
+T2S_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", "{system_prompt}"),
+        ("user", "Question: {question}"),
+    ]
+)
+
+
+#####################################################################
+## Registry of LLM clients, sharing one HTTP pool per LLM server   ##
+#####################################################################
+
+_registry_lock = threading.Lock()
+_http_clients: dict = {}
+_http_async_clients: dict = {}
+_llm_clients: dict = {}
+_llm_chains: dict = {}
+
+
+def _http_limits() -> httpx.Limits:
+
+    max_connections = int(env['llm_max_connections'])
+
+    return httpx.Limits(max_connections=max_connections,
+                        max_keepalive_connections=max_connections,
+                        keepalive_expiry=float(env['llm_keepalive_expiry']))
+
+
+def _get_http_client(base: str) -> httpx.Client:
+
+    client = _http_clients.get(base)
+    if client is None:
+        client = httpx.Client(limits=_http_limits(), timeout=None, follow_redirects=True)
+        _http_clients[base] = client
+
+    return client
+
+
+def _get_http_async_client(base: str) -> httpx.AsyncClient:
+
+    client = _http_async_clients.get(base)
+    if client is None:
+        client = httpx.AsyncClient(limits=_http_limits(), timeout=None, follow_redirects=True)
+        _http_async_clients[base] = client
+
+    return client
+
+
+def get_llm_client(base: str, api: str, model: str, temperature: float) -> ChatOpenAI:
+    """ Returns the shared client for an LLM server, model and temperature. """
+
+    key = (base, api, model, float(temperature))
+
+    with _registry_lock:
+        llm = _llm_clients.get(key)
+        if llm is None:
+            llm = ChatOpenAI(model_name=model,
+                             temperature=float(temperature),
+                             openai_api_base=base,
+                             openai_api_key=api,
+                             http_client=_get_http_client(base),
+                             http_async_client=_get_http_async_client(base))
+            _llm_clients[key] = llm
+
+    return llm
+
+
+def get_llm_chain(base: str, api: str, model: str, temperature: float, output: type[BaseModel]):
+    """
+    Returns the cached prompt | structured-output chain for a client and output model.
+    The chain returns the raw message as well, for its token usage.
+    """
+
+    key = (base, api, model, float(temperature), output)
+
+    chain = _llm_chains.get(key)
+    if chain is None:
+        llm = get_llm_client(base=base, api=api, model=model, temperature=temperature)
+        chain = T2S_PROMPT | llm.with_structured_output(output, include_raw=True)
+        with _registry_lock:
+            chain = _llm_chains.setdefault(key, chain)
+
+    return chain
+
+
+def close_llm_clients() -> None:
+    """
+    Closes the sync HTTP pools. The async pools belong to the event loop of the server and are
+    closed there by aclose_llm_clients; once that loop is closed, they can only be dropped.
+    """
+
+    with _registry_lock:
+        for client in _http_clients.values():
+            client.close()
+        _http_clients.clear()
+        _http_async_clients.clear()
+        _llm_clients.clear()
+        _llm_chains.clear()
+
+
+async def aclose_llm_clients() -> None:
+    """ Closes the async HTTP pools, on the event loop that used them, before it exits. """
+
+    with _registry_lock:
+        async_clients = list(_http_async_clients.values())
+        _http_async_clients.clear()
+        _llm_clients.clear()
+        _llm_chains.clear()
+
+    for client in async_clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.error(f"LLM - Error closing HTTP client: {e}")
+
+
+def _parsed_result(result: dict, model: str, span: dict):
+    """ Records the token usage of an LLM call and returns the structured output. """
+
+    usage = getattr(result.get('raw'), 'usage_metadata', None) or {}
+    span["prompt_tokens"] = usage.get('input_tokens', 0)
+    span["completion_tokens"] = usage.get('output_tokens', 0)
+
+    metrics.inc("t2s_llm_tokens_total", span["prompt_tokens"], help_text="Tokens sent to and received from the LLM",
+                model=model, kind="prompt")
+    metrics.inc("t2s_llm_tokens_total", span["completion_tokens"], help_text="Tokens sent to and received from the LLM",
+                model=model, kind="completion")
+    metrics.inc("t2s_llm_calls_total", help_text="Calls of the LLM", model=model)
+
+    if result.get('parsing_error') is not None:
+        raise result['parsing_error']
+
+    return result['parsed']
+
+
 def invoke_llm(base: str, api: str, model: str, temperature: float, prompt: str, query: str, output: BaseModel):
 
-    llm = ChatOpenAI(model_name=model,
-                         temperature=temperature,
-                         openai_api_base=base,
-                         openai_api_key=api)
+    process = get_llm_chain(base=base, api=api, model=model, temperature=temperature, output=output)
+
+    with metrics.span("llm", model=model, output=output.__name__) as span:
+        result = process.invoke({"system_prompt": prompt, "question": query})
+        return _parsed_result(result, model, span)
 
-    question = query
 
-    t2s_prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", prompt),
-            ("user", "Question: {question}"),
-        ]
-    )
-    structured_llm = llm.with_structured_output(output)
-    process = t2s_prompt | structured_llm
+async def ainvoke_llm(base: str, api: str, model: str, temperature: float, prompt: str, query: str, output: BaseModel):
+    """ Same as invoke_llm, but awaits the LLM server without blocking the event loop. """
 
-    result = process.invoke({"question": question})
+    process = get_llm_chain(base=base, api=api, model=model, temperature=temperature, output=output)
 
-    return result
\ No newline at end of file
+    with metrics.span("llm", model=model, output=output.__name__) as span:
+        result = await process.ainvoke({"system_prompt": prompt, "question": query})
+        return _parsed_result(result, model, span)
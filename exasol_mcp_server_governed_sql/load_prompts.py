@@ -20,4 +20,12 @@ def load_render_prompt(db_schema: str) -> str:
 
     prompt = importlib.resources.read_text("exasol_mcp_server_governed_sql.resources", "result_rendering_prompt.txt")
 
-    return prompt.format(db_schema=db_schema)
\ No newline at end of file
+    return prompt.format(db_schema=db_schema)
+
+
+def load_repair_prompt(db_schema: str, schema: str, sql_statement: str, sql_error: str) -> str:
+    """ Load the Exasol prompt for repairing a failed SQL statement."""
+
+    prompt = importlib.resources.read_text("exasol_mcp_server_governed_sql.resources", "sql_repair_prompt.txt")
+
+    return prompt.format(db_schema=db_schema, schema=schema, sql_statement=sql_statement, sql_error=sql_error)
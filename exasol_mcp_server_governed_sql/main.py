@@ -21,8 +21,12 @@ VERSION = '1.6.2.1'
 ## Standard Python packages
 ##
 
-import chromadb
+import asyncio
 import click
+import contextlib
+import sys
+import threading
+import time
 
 
 ##
@@ -35,16 +39,19 @@ from exasol.ai.mcp.server.tools.mcp_server import ExasolMCPServer
 ##
 ## Thext-to-SQL (GovernedSQL) packages
 ##
+## Modules using ChromaDB, LangChain/LangGraph, sqlglot or numpy are imported where they
+## are used, or by the warm-up, so the server answers the MCP handshake right after start.
+##
 
 from exasol_mcp_server_governed_sql.helpers import set_logging_label
-from exasol_mcp_server_governed_sql.sql_audit import text_to_sql_audit
-from exasol_mcp_server_governed_sql.text_to_sql import t2s_start_process
-from exasol_mcp_server_governed_sql.learn_sql import learn_sql
+from exasol_mcp_server_governed_sql.metrics import metrics
+from exasol_mcp_server_governed_sql.scheduler import t2s_scheduler
 from exasol_mcp_server_governed_sql.intro import (
     env,
     GraphState,
     logger,
     LOGGING,
+    setup_logging
 )
 
 
@@ -53,45 +60,215 @@ from exasol_mcp_server_governed_sql.intro import (
 ##############################
 
 
+def t2s_response(state: GraphState) -> dict:
+    """
+    The answer of a translation for the client: the SQL statement, the rendered result, the info
+    message and the statistics. Rows, the parsed statement and the connection stay on the server.
+    """
+
+    return {
+        "sql_statement": state.get('sql_statement', ''),
+        "sql_is_valid": state.get('sql_is_valid', 'NO'),
+        "sql_reused": state.get('sql_reused', 'NO'),
+        "display_result": state.get('display_result', ''),
+        "info": state.get('info', ''),
+        "query_num_rows": state.get('query_num_rows', 0),
+        "query_truncated": state.get('query_truncated', False),
+        "num_of_attempts": state.get('num_of_attempts', 0),
+        "attempt_history": state.get('attempt_history', []),
+        "queue_depth": state.get('queue_depth', 0),
+        "queue_wait_time": state.get('queue_wait_time', 0.0),
+        "result_cache_hit": state.get('result_cache_hit', False),
+    }
+
+
 class Text2SQL:
 
     def __init__(self, connection: DbConnection) -> None:
         self.connection = connection
-        self.state: GraphState = GraphState()
 
-    def text_to_sql(self ,question: str, db_schema: str):
+    async def text_to_sql(self ,question: str, db_schema: str, use_result_cache: bool = True):
+
+        from exasol_mcp_server_governed_sql.text_to_sql import t2s_start_process
 
         set_logging_label(logging=LOGGING, logger=logger, label="##### Starting Text-to-SQL")
         set_logging_label(logging=LOGGING, logger=logger, label=f"### Database schema: {db_schema}")
         set_logging_label(logging=LOGGING, logger=logger, label=f"### Question: {question}")
 
-        self.state['question'] = question
-        self.state['db_schema'] = db_schema
-        self.state['connection'] = self.connection
+        ## Every call works on its own state, requests beyond the limits of the scheduler wait or are rejected
+
+        async with t2s_scheduler.slot() as ticket:
+
+            set_logging_label(logging=LOGGING, logger=logger,
+                              label=f"### Queue depth: {ticket['queue_depth']}, waited {ticket['queue_wait_time']:.2f} seconds")
+
+            state: GraphState = GraphState(question=question,
+                                           db_schema=db_schema,
+                                           connection=self.connection,
+                                           queue_depth=ticket['queue_depth'],
+                                           queue_wait_time=ticket['queue_wait_time'],
+                                           use_result_cache=use_result_cache)
+
+            state = await t2s_start_process(state)
+
+        ## The question asked, a retry may have rewritten the one of the state
+
+        return {"question": question, "db_schema": db_schema, **t2s_response(state)}
+
+    async def text_to_sql_batch(self, questions: list[str], db_schema: str, use_result_cache: bool = True):
+
+        from exasol_mcp_server_governed_sql.database_functions import run_db_call, t2s_schema_fingerprint
+
+        set_logging_label(logging=LOGGING, logger=logger, label=f"##### Starting Text-to-SQL batch with {len(questions)} questions")
+
+        total_start_time = time.time()
+
+        ## Load the schema metadata once for all questions, the translations are served from the cache
+
+        await run_db_call(t2s_schema_fingerprint, connection=self.connection, db_schema=db_schema)
 
-        state = t2s_start_process(self.state)
+        batch_slots = asyncio.Semaphore(int(env['batch_concurrency']))
 
-        return state
+        async def answer(question: str) -> dict:
 
+            async with batch_slots:
+                start_time = time.time()
+                try:
+                    result = await self.text_to_sql(question=question, db_schema=db_schema,
+                                                    use_result_cache=use_result_cache)
+                except Exception as e:
+                    logger.error(f"Text-to-SQL batch - Error for question '{question}': {e}")
+                    result = {"question": question, "error": str(e)}
+                result["elapsed_time"] = time.time() - start_time
 
-def sql_audit(search_text: str, db_schema: str, number_results: int=5):
+            return result
+
+        results = await asyncio.gather(*(answer(question) for question in questions))
+
+        return {
+            "db_schema": db_schema,
+            "results": results,
+            "total_time": time.time() - total_start_time,
+        }
+
+
+async def sql_audit(search_text: str, db_schema: str, number_results: int=5, search_mode: str = "semantic",
+                    user: str = "", date_from: str = "", date_to: str = "", cursor: str = ""):
+
+    from exasol_mcp_server_governed_sql.database_functions import run_db_call
+    from exasol_mcp_server_governed_sql.sql_audit import text_to_sql_audit
 
     if env['logger']:
         set_logging_label(logging=LOGGING, logger=logger, label="##### Retrieving SQL Statements from VectorDB")
 
-    result = text_to_sql_audit(search_text=search_text, db_schema=db_schema, number_results=number_results)
+    result = await run_db_call(text_to_sql_audit, search_text=search_text, db_schema=db_schema,
+                               number_results=number_results, search_mode=search_mode, user=user,
+                               date_from=date_from, date_to=date_to, cursor=cursor)
 
     return result
 
 
 def teach_sql(question: str, sql_statement: str, db_schema: str):
 
+    from exasol_mcp_server_governed_sql.learn_sql import learn_sql
+
     if env['logger']:
         set_logging_label(logging=LOGGING, logger=logger, label="##### Teaching VectorDB with Question/SQL Statement")
 
     learn_sql(question, sql_statement, db_schema)
 
 
+async def teach_sql_bulk(file_path: str, db_schema: str = "", resume: bool = True):
+
+    from exasol_mcp_server_governed_sql.bulk_sql import import_sql_pairs, resolve_bulk_path
+    from exasol_mcp_server_governed_sql.database_functions import run_db_call
+
+    ## Clients name files within EXA_MCP_BULK_DIRECTORY only, never arbitrary files of the server
+
+    try:
+        path = resolve_bulk_path(file_path, env['bulk_directory'])
+    except ValueError as e:
+        logger.error(f"Bulk import - Error: {e}")
+        return {"file": file_path, "error": str(e)}
+
+    if env['logger']:
+        set_logging_label(logging=LOGGING, logger=logger, label=f"##### Teaching VectorDB with Question/SQL Statements from {path}")
+
+    return await run_db_call(import_sql_pairs, path=path, db_schema=db_schema, resume=resume)
+
+
+async def export_taught_sql(file_path: str, db_schema: str = ""):
+
+    from exasol_mcp_server_governed_sql.bulk_sql import export_sql_pairs, resolve_bulk_path
+    from exasol_mcp_server_governed_sql.database_functions import run_db_call
+
+    try:
+        path = resolve_bulk_path(file_path, env['bulk_directory'])
+    except ValueError as e:
+        logger.error(f"Bulk export - Error: {e}")
+        return {"file": file_path, "error": str(e)}
+
+    if env['logger']:
+        set_logging_label(logging=LOGGING, logger=logger, label=f"##### Exporting taught Question/SQL Statements to {path}")
+
+    return await run_db_call(export_sql_pairs, path=path, db_schema=db_schema)
+
+
+def refresh_schema_metadata(db_schema: str = ""):
+
+    from exasol_mcp_server_governed_sql.database_functions import invalidate_schema_cache
+
+    if env['logger']:
+        set_logging_label(logging=LOGGING, logger=logger, label=f"##### Invalidating cached schema metadata: {db_schema or 'ALL'}")
+
+    return invalidate_schema_cache(db_schema)
+
+
+def cache_statistics():
+
+    from exasol_mcp_server_governed_sql.database_functions import result_cache, schema_cache
+    from exasol_mcp_server_governed_sql.embedding_cache import embedding_cache
+
+    return {"schema_cache": schema_cache.stats(),
+            "embedding_cache": embedding_cache.stats(),
+            "result_cache": result_cache.stats()}
+
+
+def _metrics_gauges() -> dict:
+    """ Current state of the scheduler, the caches and the audit writer as flat gauges. """
+
+    from exasol_mcp_server_governed_sql.audit_writer import audit_writer
+    from exasol_mcp_server_governed_sql.database_functions import result_cache, schema_cache
+    from exasol_mcp_server_governed_sql.embedding_cache import embedding_cache
+
+    gauges = {}
+
+    for prefix, stats in (("t2s_scheduler", t2s_scheduler.stats()),
+                          ("t2s_schema_cache", schema_cache.stats()),
+                          ("t2s_embedding_cache", embedding_cache.stats()),
+                          ("t2s_result_cache", result_cache.stats())):
+        for name, value in stats.items():
+            if isinstance(value, (int, float)):
+                gauges[f"{prefix}_{name}"] = value
+
+    gauges["t2s_audit_writer_written"] = audit_writer.written
+    gauges["t2s_audit_writer_dropped"] = audit_writer.dropped
+
+    return gauges
+
+
+def t2s_metrics():
+
+    from exasol_mcp_server_governed_sql.audit_writer import audit_writer
+    from exasol_mcp_server_governed_sql.text_to_sql import t2s_attempt_statistics
+
+    return {**metrics.snapshot(),
+            "scheduler": t2s_scheduler.stats(),
+            "attempts": t2s_attempt_statistics(),
+            **cache_statistics(),
+            "audit_writer": {"written": audit_writer.written, "dropped": audit_writer.dropped}}
+
+
 #####################################################################
 ## Register tool sof this module in addition to the original tools ##
 #####################################################################
@@ -105,17 +282,35 @@ def _register_text_to_sql(the_mcp_server: ExasolMCPServer) -> None:
             "SQL statements and executes it against the database. "
             "ALWAYS use this tool for translation of natural language questions into SQL. "
             "The tool always retrieves the metadata of the requested schema on its own. "
+            "Results of identical queries are served from a short-lived cache, reported as "
+            "result_cache_hit; set use_result_cache to false to always query the database. "
             "Do not use other tools!"
         ),
     )
 
+def _register_text_to_sql_batch(the_mcp_server: ExasolMCPServer) -> None:
+    text_to_sql_batch_with_con = Text2SQL(the_mcp_server.connection).text_to_sql_batch
+    the_mcp_server.tool(
+        text_to_sql_batch_with_con,
+        description=(
+            "The tool translates a list of human questions / natural language questions for the "
+            "same database schema into SQL statements and executes them against the database. "
+            "Use this tool instead of calling the text_to_sql tool many times, e.g. to build a report. "
+            "It returns the result and the elapsed time for each question."
+        ),
+    )
+
 def _register_text_to_sql_audit(the_mcp_server: ExasolMCPServer) -> None:
     the_mcp_server.tool(
         sql_audit,
         description=(
             "The tool returns SQL queries and the corresponding questions for the requested "
-            "database schema. You can search with phrases in the SQL history. Results are "
-            "returned based semantic search and the distance to the search term. "
+            "database schema. You can search with phrases in the SQL history. With search_mode "
+            "'semantic' (default), results are ordered by the distance to the search text; with "
+            "'keyword', questions containing the search text are returned, newest first. Without "
+            "search text, the newest entries are returned. Results can be filtered by user and by "
+            "date range (date_from, date_to as ISO dates). Pass the returned next_cursor as cursor "
+            "to retrieve the next page. "
         ),
     )
 
@@ -128,23 +323,156 @@ def _register_teach_sql(the_mcp_server: ExasolMCPServer) -> None:
         ),
     )
 
+def _register_teach_sql_bulk(the_mcp_server: ExasolMCPServer) -> None:
+    the_mcp_server.tool(
+        teach_sql_bulk,
+        description=(
+            "The tool stores many combinations of natural language questions and their corresponding "
+            "SQL statements from a JSONL or CSV file in the bulk directory of the server into a VectorDB. "
+            "The file path is relative to that directory. An interrupted "
+            "import continues where it stopped. It does not execute a query or answer an question."
+        ),
+    )
+    the_mcp_server.tool(
+        export_taught_sql,
+        description=(
+            "The tool writes the stored combinations of natural language questions and SQL statements, "
+            "optionally of one database schema, into a JSONL or CSV file in the bulk directory of the server. "
+            "The file path is relative to that directory."
+        ),
+    )
+
+def _register_refresh_schema_metadata(the_mcp_server: ExasolMCPServer) -> None:
+    the_mcp_server.tool(
+        refresh_schema_metadata,
+        description=(
+            "The tool drops the cached metadata and query results of the given database schema, or of all "
+            "schemas if no schema is given, e.g. after tables, columns or data have been changed. "
+            "It returns the statistics of the schema metadata cache."
+        ),
+    )
+    the_mcp_server.tool(
+        cache_statistics,
+        description=(
+            "The tool returns the statistics of the in-memory caches of the server: entries, hits, "
+            "misses, the hit ratio and the memory used by the question embeddings."
+        ),
+    )
+
+def _register_metrics(the_mcp_server: ExasolMCPServer) -> None:
+    the_mcp_server.tool(
+        t2s_metrics,
+        description=(
+            "The tool returns the performance metrics of the Text-to-SQL process: latency histograms "
+            "(count, average, p50, p95, p99) per graph node, LLM call, catalog query, user query and "
+            "VectorDB operation, LLM token counts, the most recent spans, the request queue, the caches "
+            "and the success of SQL statements per attempt."
+        ),
+    )
+
+def _register_metrics_route(the_mcp_server: ExasolMCPServer) -> None:
+
+    from starlette.requests import Request
+    from starlette.responses import PlainTextResponse
+
+    @the_mcp_server.custom_route("/metrics", methods=["GET"])
+    async def prometheus_metrics(request: Request) -> PlainTextResponse:
+        return PlainTextResponse(metrics.render_prometheus(_metrics_gauges()),
+                                 media_type="text/plain; version=0.0.4")
+
+
+def _register_lifespan(the_mcp_server: ExasolMCPServer) -> None:
+
+    ## The async HTTP pools of the LLM clients can only be closed on the event loop of the server,
+    ## i.e. at the end of its lifespan; shutdown() runs after the loop is closed
+
+    server_lifespan = the_mcp_server._lifespan
+
+    @contextlib.asynccontextmanager
+    async def lifespan(server):
+        async with server_lifespan(server) as lifespan_result:
+            try:
+                yield lifespan_result
+            finally:
+                llm_module = sys.modules.get("exasol_mcp_server_governed_sql.llm")
+                if llm_module is not None:
+                    await llm_module.aclose_llm_clients()
+
+    the_mcp_server._lifespan = lifespan
+
 
 ########################################################
 ## Test for VectorDB, if not exists, create a new one ##
+##----------------------------------------------------##
+## The VectorDB stays open until the server stops     ##
 ########################################################
 
 def check_vectordb():
 
-    try:
+    from exasol_mcp_server_governed_sql.audit_writer import audit_writer
+    from exasol_mcp_server_governed_sql.sql_audit import backfill_execution_ts
+    from exasol_mcp_server_governed_sql.vectordb import vector_store
 
-        vectordb_client = chromadb.PersistentClient(path=env['vectordb_persistent_storage'])
-        vectordb_client.get_or_create_collection(name="SQL_Audit")
+    vector_store.open()
+    vector_store.collection("SQL_Audit")
+    vector_store.collection("Questions_SQL_History")
+    backfill_execution_ts()
+    audit_writer.start()
 
-    except Exception as e:
-        print(f"VectorDB - Startup - Check: {e}")
-        exit()
-    else:
-        print("VectorDB - Startup - Check: OK")
+    ## Never on stdout, it carries the MCP protocol in STDIO mode
+    logger.info("VectorDB - Startup - Check: OK")
+
+
+#################################################################
+## Warm-up: load the heavy subsystems before the first request ##
+#################################################################
+
+def warm_up() -> None:
+    """ Opens the VectorDB, compiles the Text-to-SQL graph and loads the embedding model. """
+
+    start_time = time.time()
+
+    check_vectordb()
+
+    from exasol_mcp_server_governed_sql.embedding_cache import embedding_cache
+    from exasol_mcp_server_governed_sql.text_to_sql import get_t2s_process
+
+    get_t2s_process()
+    embedding_cache.embedding_function(["warm-up"])
+
+    logger.info(f"Warm-up finished in {time.time() - start_time:.2f} seconds")
+
+
+def start_warm_up() -> threading.Thread:
+    """ Runs the warm-up in the background; a request arriving earlier loads what it needs itself. """
+
+    def run() -> None:
+        try:
+            warm_up()
+        except Exception as e:
+            logger.error(f"VectorDB - Startup - Check: {e}")
+
+    thread = threading.Thread(target=run, name="t2s-warm-up", daemon=True)
+    thread.start()
+
+    return thread
+
+
+def shutdown():
+
+    ## Only what was loaded needs to be closed; pending audit records are written before the VectorDB is closed
+
+    audit_writer_module = sys.modules.get("exasol_mcp_server_governed_sql.audit_writer")
+    if audit_writer_module is not None:
+        audit_writer_module.audit_writer.stop()
+
+    vectordb_module = sys.modules.get("exasol_mcp_server_governed_sql.vectordb")
+    if vectordb_module is not None:
+        vectordb_module.vector_store.close()
+
+    llm_module = sys.modules.get("exasol_mcp_server_governed_sql.llm")
+    if llm_module is not None:
+        llm_module.close_llm_clients()
 
 
 ##################################################
@@ -162,7 +490,15 @@ def main_http(transport, host, port) -> None:
        Main entry point that creates and runs the MCP server centralized.
     """
 
-    check_vectordb()
+    setup_logging()
+
+    ## The centralized server is ready before it accepts requests and stops, if the VectorDB fails
+
+    try:
+        warm_up()
+    except Exception as e:
+        logger.error(f"VectorDB - Startup - Check: {e}")
+        sys.exit(1)
 
     ## Initiate the official Exasol MCP Server and register additional tools
 
@@ -171,13 +507,22 @@ def main_http(transport, host, port) -> None:
 
 
     _register_text_to_sql(server)
+    _register_text_to_sql_batch(server)
     _register_text_to_sql_audit(server)
     _register_teach_sql(server)
+    _register_teach_sql_bulk(server)
+    _register_refresh_schema_metadata(server)
+    _register_metrics(server)
+    _register_metrics_route(server)
+    _register_lifespan(server)
 
 
    ##  Finally, run the server
 
-    server.run(transport=transport, host=host, port=port)
+    try:
+        server.run(transport=transport, host=host, port=port)
+    finally:
+        shutdown()
 
 
 
@@ -190,16 +535,80 @@ def main():
     Main entry point that creates and runs the MCP server locally.
     """
 
-    check_vectordb()
+    ## MCP clients start this server per session: answer the handshake first, warm up in the background
+
+    setup_logging()
+    start_warm_up()
 
     server = mcp_server()
 
     _register_text_to_sql(server)
+    _register_text_to_sql_batch(server)
     _register_text_to_sql_audit(server)
     _register_teach_sql(server)
+    _register_teach_sql_bulk(server)
+    _register_refresh_schema_metadata(server)
+    _register_metrics(server)
+    _register_lifespan(server)
+
+    try:
+        server.run()
+    finally:
+        shutdown()
+
 
-    server.run()
 
+#########################################################################
+## bulk: Import / export of question/SQL pairs from the command line  ##
+#########################################################################
+
+@click.group()
+@click.version_option(VERSION, message="Version: %(version)s")
+def bulk() -> None:
+    """
+    Bulk import and export of question/SQL pairs for the VectorDB.
+    """
+
+    setup_logging()
+
+
+@bulk.command(name="import")
+@click.argument("file_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--db-schema", default="", help="Database schema for records without 'db_schema'")
+@click.option("--chunk-size", default=256, type=click.IntRange(min=1), help="Records per write (default: 256)")
+@click.option("--no-resume", is_flag=True, help="Start from the first record, ignore a previous interrupted import")
+def bulk_import(file_path, db_schema, chunk_size, no_resume) -> None:
+
+    from exasol_mcp_server_governed_sql.bulk_sql import import_sql_pairs
+    from exasol_mcp_server_governed_sql.vectordb import vector_store
+
+    try:
+        result = import_sql_pairs(path=file_path, db_schema=db_schema, chunk_size=chunk_size, resume=not no_resume)
+    finally:
+        vector_store.close()
+
+    for rejected_line in result['rejected_lines']:
+        click.echo(f"Line {rejected_line['line']} rejected: {rejected_line['error']}", err=True)
+
+    click.echo(f"Imported {result['imported']} pairs ({result['rejected']} rejected, {result['skipped_by_resume']} "
+               f"already imported) in {result['elapsed_time']:.1f} seconds: {result['rows_per_second']:.1f} pairs/s")
+
+
+@bulk.command(name="export")
+@click.argument("file_path", type=click.Path(dir_okay=False))
+@click.option("--db-schema", default="", help="Export the pairs of this database schema only")
+def bulk_export(file_path, db_schema) -> None:
+
+    from exasol_mcp_server_governed_sql.bulk_sql import export_sql_pairs
+    from exasol_mcp_server_governed_sql.vectordb import vector_store
+
+    try:
+        result = export_sql_pairs(path=file_path, db_schema=db_schema)
+    finally:
+        vector_store.close()
+
+    click.echo(f"Exported {result['exported']} pairs in {result['elapsed_time']:.1f} seconds: "
+               f"{result['rows_per_second']:.1f} pairs/s")
 
 
 if __name__ == "__main__":
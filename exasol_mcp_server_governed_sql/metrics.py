@@ -0,0 +1,238 @@
+##############################################################
+## Exasol MCP server with Text-to-SQL query option          ##
+## Module: Spans, counters and latency histograms           ##
+##----------------------------------------------------------##
+## Version 1.0.0 DirkB@Exasol : Initial version             ##
+##############################################################
+
+import contextvars
+import inspect
+import threading
+import time
+
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+
+## Upper bounds in seconds, from a catalog cache hit up to a slow LLM answer
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+RECENT_SPANS = 200
+
+## Graph node and attempt of the running request, picked up by nested spans (e.g. LLM calls)
+
+current_node = contextvars.ContextVar("t2s_current_node", default="")
+current_attempt = contextvars.ContextVar("t2s_current_attempt", default=0)
+
+
+class Histogram:
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+
+        position = len(self.buckets)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                position = index
+                break
+
+        self.counts[position] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """ Estimated like Prometheus' histogram_quantile(): linear within the bucket. """
+
+        if self.count == 0:
+            return 0.0
+
+        rank = q * self.count
+        cumulative = 0
+
+        for index, count in enumerate(self.counts):
+            if cumulative + count >= rank and count > 0:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+
+        return self.buckets[-1]
+
+    def summary(self) -> dict:
+
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class MetricsRegistry:
+    """
+    Keeps latency histograms and counters in memory, labelled e.g. by graph node or
+    model, and the most recent spans. Rendered as JSON for the metrics tool and in
+    the Prometheus text format for the HTTP server.
+    """
+
+    def __init__(self) -> None:
+        self._histograms: dict = {}
+        self._counters: dict = {}
+        self._help: dict = {}
+        self._recent = deque(maxlen=RECENT_SPANS)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def observe(self, name: str, value: float, help_text: str = "", **labels) -> None:
+
+        key = self._key(name, labels)
+
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+                self._help.setdefault(name, help_text)
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, help_text: str = "", **labels) -> None:
+
+        key = self._key(name, labels)
+
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._help.setdefault(name, help_text)
+
+    def record_span(self, span: dict) -> None:
+
+        with self._lock:
+            self._recent.append(span)
+
+    @contextmanager
+    def span(self, stage: str, **labels):
+        """
+        Times the enclosed block as 'stage'. The yielded dict takes additional
+        attributes, e.g. token counts, which end up in the recorded span.
+        """
+
+        attributes = {"stage": stage, "node": current_node.get(), "attempt": current_attempt.get(), **labels}
+        start_time = time.perf_counter()
+        failed = False
+
+        try:
+            yield attributes
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            duration = time.perf_counter() - start_time
+            attributes["duration"] = duration
+            attributes["failed"] = failed
+            self.observe("t2s_stage_duration_seconds", duration,
+                         help_text="Duration of the stages of a Text-to-SQL request",
+                         stage=stage, **labels)
+            if failed:
+                self.inc("t2s_stage_errors_total", help_text="Failed stages of Text-to-SQL requests",
+                         stage=stage, **labels)
+            self.record_span(attributes)
+
+    def snapshot(self) -> dict:
+
+        with self._lock:
+            histograms = [{"name": name, **dict(labels), **histogram.summary()}
+                          for (name, labels), histogram in sorted(self._histograms.items())]
+            counters = [{"name": name, **dict(labels), "value": value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            recent = list(self._recent)
+
+        return {"histograms": histograms, "counters": counters, "recent_spans": recent}
+
+    def render_prometheus(self, gauges: dict = None) -> str:
+        """ Histograms, counters and the given gauges ({name: value}) in the Prometheus text format. """
+
+        def label_text(labels: tuple, extra: tuple = ()) -> str:
+            pairs = [f'{key}="{value}"' for key, value in labels + extra]
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+
+        lines, typed = [], set()
+
+        with self._lock:
+
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f"# HELP {name} {self._help.get(name, '')}")
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{label_text(labels, (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{label_text(labels, (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{label_text(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{label_text(labels)} {histogram.count}")
+
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    lines.append(f"# HELP {name} {self._help.get(name, '')}")
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{label_text(labels)} {value}")
+
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {float(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def timed_node(name: str, node):
+    """ Wraps a graph node, so every execution is recorded as a span of the node. """
+
+    def _enter(state) -> tuple:
+        return current_node.set(name), current_attempt.set(state.get('num_of_attempts', 0))
+
+    def _leave(tokens: tuple) -> None:
+        current_node.reset(tokens[0])
+        current_attempt.reset(tokens[1])
+
+    if inspect.iscoroutinefunction(node):
+
+        @wraps(node)
+        async def async_wrapper(state):
+            tokens = _enter(state)
+            try:
+                with metrics.span("node", node=name):
+                    return await node(state)
+            finally:
+                _leave(tokens)
+
+        return async_wrapper
+
+    @wraps(node)
+    def wrapper(state):
+        tokens = _enter(state)
+        try:
+            with metrics.span("node", node=name):
+                return node(state)
+        finally:
+            _leave(tokens)
+
+    return wrapper
@@ -0,0 +1,75 @@
+##############################################################
+## Exasol MCP server with Text-to-SQL query option          ##
+## Module: Local relevance check with embeddings            ##
+##----------------------------------------------------------##
+## Version 1.0.0 DirkB@Exasol : Initial version             ##
+##############################################################
+
+import numpy as np
+import threading
+
+from exasol_mcp_server_governed_sql.embedding_cache import embedding_cache
+
+
+_schema_embeddings: dict = {}
+_lock = threading.Lock()
+
+
+def _normalize(vectors) -> np.ndarray:
+
+    vectors = np.array(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def schema_descriptions(columns: list) -> list:
+    """ One description per table and per column, including the column comments. """
+
+    descriptions = []
+    old_table = ""
+
+    for table, column, column_type, comment in columns:
+
+        if table != old_table:
+            descriptions.append(f"table {table}")
+            old_table = table
+
+        description = f"{table} {column}"
+        if comment:
+            description += f": {comment}"
+        descriptions.append(description)
+
+    return descriptions
+
+
+def _schema_vectors(db_schema: str, fingerprint: str, columns: list) -> np.ndarray:
+
+    key = (db_schema, fingerprint)
+
+    vectors = _schema_embeddings.get(key)
+    if vectors is None:
+        ## The schema descriptions are cached per fingerprint here, not in the question cache
+        vectors = _normalize(embedding_cache.embedding_function(schema_descriptions(columns)))
+        with _lock:
+            ## Embeddings of older versions of the schema are not needed anymore
+            for old_key in [k for k in _schema_embeddings if k[0] == db_schema]:
+                del _schema_embeddings[old_key]
+            _schema_embeddings[key] = vectors
+
+    return vectors
+
+
+def question_relevance(question: str, db_schema: str, fingerprint: str, columns: list) -> float:
+    """
+    Returns the highest cosine similarity between the question and the descriptions
+    of the tables and columns of the schema.
+    """
+
+    if not columns:
+        return 0.0
+
+    schema_vectors = _schema_vectors(db_schema=db_schema, fingerprint=fingerprint, columns=columns)
+    question_vector = _normalize(embedding_cache.embed([question]))[0]
+
+    return float(np.max(schema_vectors @ question_vector))
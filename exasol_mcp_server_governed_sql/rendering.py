@@ -0,0 +1,94 @@
+##############################################################
+## Exasol MCP server with Text-to-SQL query option          ##
+## Module: Local rendering of result sets                   ##
+##----------------------------------------------------------##
+## Version 1.0.0 DirkB@Exasol : Initial version             ##
+##############################################################
+
+import csv
+import io
+import json
+
+from exasol_mcp_server_governed_sql.intro import logger
+
+
+RENDERING_FORMATS = ("markdown", "csv", "json")
+
+_reported_formats: set = set()
+
+
+def _truncation_note(num_rows_shown: int, num_rows: int) -> str:
+
+    return f"Showing {num_rows_shown} of {num_rows} rows."
+
+
+def _markdown_cell(value) -> str:
+
+    if value is None:
+        return "NULL"
+
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def render_markdown(columns: list, rows: list, num_rows: int, truncated: bool) -> str:
+
+    lines = [
+        "| " + " | ".join(_markdown_cell(column) for column in columns) + " |",
+        "|" + "|".join(" --- " for _ in columns) + "|",
+    ]
+    lines.extend("| " + " | ".join(_markdown_cell(value) for value in row) + " |" for row in rows)
+
+    if truncated:
+        lines.append("")
+        lines.append(f"_{_truncation_note(len(rows), num_rows)}_")
+
+    return "\n".join(lines)
+
+
+def render_csv(columns: list, rows: list, num_rows: int, truncated: bool) -> str:
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    writer.writerows(rows)
+
+    if truncated:
+        buffer.write(f"# {_truncation_note(len(rows), num_rows)}\n")
+
+    return buffer.getvalue()
+
+
+def render_json(columns: list, rows: list, num_rows: int, truncated: bool) -> str:
+
+    ## Rows as lists in the order of 'columns': column names need not be unique (SELECT a.ID, b.ID ...)
+
+    return json.dumps(
+        {
+            "columns": list(columns),
+            "rows": [list(row) for row in rows],
+            "num_rows": num_rows,
+            "truncated": truncated,
+        },
+        default=str,
+    )
+
+
+def render_result(result_format: str, columns: list, rows: list, num_rows: int, truncated: bool) -> str:
+    """ Renders a result set as markdown table, CSV or JSON without involving the LLM. """
+
+    result_format = result_format.lower()
+
+    if result_format not in RENDERING_FORMATS:
+        if result_format not in _reported_formats:
+            _reported_formats.add(result_format)
+            logger.error(f"Unknown EXA_MCP_RESULT_RENDERING '{result_format}', expected one of "
+                         f"{', '.join(RENDERING_FORMATS + ('llm',))}; rendering as markdown")
+        result_format = "markdown"
+
+    renderer = {
+        "markdown": render_markdown,
+        "csv": render_csv,
+        "json": render_json,
+    }[result_format]
+
+    return renderer(columns=columns, rows=rows, num_rows=num_rows, truncated=truncated)
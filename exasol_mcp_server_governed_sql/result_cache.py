@@ -0,0 +1,98 @@
+##############################################################
+## Exasol MCP server with Text-to-SQL query option          ##
+## Module: In-process cache for query results               ##
+##----------------------------------------------------------##
+## Version 1.0.0 DirkB@Exasol : Initial version             ##
+##############################################################
+
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Keeps the (bounded) result sets of executed queries, keyed by the canonical SQL statement,
+    the schema and the database user. Entries expire after 'ttl' seconds; the least recently
+    used ones are dropped beyond 'max_entries' entries or 'max_bytes' bytes. A TTL of 0
+    disables caching.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+
+        return self.ttl > 0 and self.max_entries > 0
+
+    def _drop(self, key: tuple) -> None:
+
+        entry = self._entries.pop(key)
+        self._bytes -= entry['size']
+
+    def get(self, key: tuple):
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and time.monotonic() - entry['stored_at'] >= self.ttl:
+                self._drop(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return entry['result']
+
+    def put(self, key: tuple, result: dict, size: int) -> None:
+
+        ## A single result beyond the memory limit would only push out everything else
+
+        if not self.enabled or size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+            self._entries[key] = {'result': result, 'size': size, 'stored_at': time.monotonic()}
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, db_schema: str = "") -> None:
+
+        with self._lock:
+            for key in [key for key in self._entries if not db_schema or key[1] == db_schema.upper()]:
+                self._drop(key)
+
+    def stats(self) -> dict:
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "ttl": self.ttl,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_bytes": self._bytes,
+            }
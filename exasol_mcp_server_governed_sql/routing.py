@@ -1,21 +1,24 @@
 
 
 from exasol_mcp_server_governed_sql.intro import logger, GraphState, LOGGING, LOGGING_MODE
-from exasol_mcp_server_governed_sql.database_functions import get_sql_query_type
 
 
 def t2s_check_sql_router(state: GraphState):
 
-    if get_sql_query_type(state["sql_statement"]):
-        state['is_allowed'] = "YES"
-    else:
-        state['is_allowed'] = "NO"
+    ## 'is_allowed' is set by t2s_check_sql_is_allowed, the statement is not parsed again
 
     if LOGGING == 'True' and LOGGING_MODE == 'debug':
         logger.debug(f"SQL-ALLOWED: {state['is_allowed']}")
 
     return state['is_allowed']
 
+def t2s_reuse_sql_router(state: GraphState) -> str:
+
+    if state['sql_reused'] == "YES":
+        return "YES"
+    else:
+        return "NO"
+
 ########################################################################
 ## Route workflow to the right path depending on determined relevance ##
 ########################################################################
@@ -0,0 +1,89 @@
+##############################################################
+## Exasol MCP server with Text-to-SQL query option          ##
+## Module: Bounded concurrency for Text-to-SQL requests     ##
+##----------------------------------------------------------##
+## Version 1.0.0 DirkB@Exasol : Initial version             ##
+##############################################################
+
+import asyncio
+import time
+
+from contextlib import asynccontextmanager
+
+from exasol_mcp_server_governed_sql.intro import env
+
+
+class SchedulerQueueFull(RuntimeError):
+    """ Raised when a new request arrives while all slots are busy and the queue is full. """
+
+
+class RequestScheduler:
+    """
+    Caps the number of translations in flight. Further requests wait in a queue
+    of limited length, requests beyond that are rejected.
+    All bookkeeping happens on the event loop, so no locks are required.
+    """
+
+    def __init__(self, max_in_flight: int, max_queued: int) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self._semaphore = None
+
+    @asynccontextmanager
+    async def slot(self):
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        if self._semaphore.locked() and self.queued >= self.max_queued:
+            self.rejected += 1
+            raise SchedulerQueueFull(
+                f"Text-to-SQL is busy: {self.in_flight} requests in progress and "
+                f"{self.queued} requests queued. Please try again later."
+            )
+
+        queue_depth = self.queued
+        start_time = time.monotonic()
+
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        wait_time = time.monotonic() - start_time
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+        self.in_flight += 1
+
+        try:
+            yield {"queue_depth": queue_depth, "queue_wait_time": wait_time}
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+
+        started = self.completed + self.in_flight
+
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queued": self.max_queued,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_time": self.total_wait_time / started if started else 0.0,
+            "max_wait_time": self.max_wait_time,
+        }
+
+
+t2s_scheduler = RequestScheduler(max_in_flight=int(env['max_concurrent_requests']),
+                                 max_queued=int(env['max_queued_requests']))
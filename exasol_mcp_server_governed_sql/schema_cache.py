@@ -0,0 +1,82 @@
+##############################################################
+## Exasol MCP server with Text-to-SQL query option          ##
+## Module: In-process cache for database schema metadata    ##
+##----------------------------------------------------------##
+## Version 1.0.0 DirkB@Exasol : Initial version             ##
+##############################################################
+
+import threading
+import time
+
+from typing import Callable
+
+
+class SchemaCache:
+    """
+    Keeps the metadata of database schemas in memory, keyed by (upper case schema name,
+    lower case database user): the catalog only shows the tables and columns the user of
+    the connection may access. Entries expire after 'ttl' seconds; a TTL of 0 disables caching.
+    Metadata without columns is never cached.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict = {}
+        self._lock = threading.Lock()
+        self._load_locks: dict = {}
+
+    def _lookup(self, key: tuple):
+
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry['loaded_at'] < self.ttl:
+            return entry['metadata']
+        return None
+
+    def get_or_load(self, key: tuple, loader: Callable[[], dict]) -> dict:
+
+        with self._lock:
+            metadata = self._lookup(key)
+            if metadata is not None:
+                self.hits += 1
+                return metadata
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        ## Only one caller per schema and user reads the catalog, all others wait for its result
+
+        with load_lock:
+            with self._lock:
+                metadata = self._lookup(key)
+                if metadata is not None:
+                    self.hits += 1
+                    return metadata
+                self.misses += 1
+
+            metadata = loader()
+
+            ## An empty schema (unknown or not accessible yet) is read again on the next request
+
+            if self.ttl > 0 and metadata.get('columns'):
+                with self._lock:
+                    self._entries[key] = {'metadata': metadata, 'loaded_at': time.monotonic()}
+
+        return metadata
+
+    def invalidate(self, db_schema: str = "") -> None:
+        """ Drops the metadata of the schema for all users, of all schemas if none is given. """
+
+        with self._lock:
+            for key in [key for key in self._entries if not db_schema or key[0] == db_schema.upper()]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+
+        with self._lock:
+            return {
+                "schemas": sorted({key[0] for key in self._entries}),
+                "entries": len(self._entries),
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
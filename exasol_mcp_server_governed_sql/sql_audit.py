@@ -3,15 +3,21 @@
 ## Module: SQL AUDIT / SEARCH                               ##
 ##----------------------------------------------------------##
 ## Version 1.0.0 DirkB@Exasol : Initial version             ##
+## Version 1.1.0 : Semantic / keyword search, pagination,   ##
+##                 filters on user and date range           ##
 ##############################################################
 
-import chromadb
 import datetime
-import sys
 
 from pydantic import BaseModel, Field
 
-from exasol_mcp_server_governed_sql.helpers import get_environment
+from exasol_mcp_server_governed_sql.embedding_cache import embedding_cache
+from exasol_mcp_server_governed_sql.intro import logger
+from exasol_mcp_server_governed_sql.metrics import metrics
+from exasol_mcp_server_governed_sql.vectordb import vector_store
+
+
+AUDIT_COLLECTIONS = ("SQL_Audit", "Questions_SQL_History")
 
 
 ##
@@ -24,36 +30,198 @@ class SqlHistory(BaseModel):
     )
 
 
-def text_to_sql_audit(search_text: str, db_schema: str, number_results: int) -> list:
+####################################################################
+## Entries written before 'execution_ts' existed get it once here ##
+####################################################################
 
-    env = get_environment()
-    print(env['vectordb_persistent_storage'])
-    result = []
-    try:
+BACKFILL_DONE = "execution_ts_backfilled"
 
-        search_text = "*" # f"*{search_text}*"
-        vectordb_client = chromadb.PersistentClient(path=env['vectordb_persistent_storage'])
-        collection = vectordb_client.get_collection(name='SQL_Audit')
-        result = collection.query(query_texts=[search_text],
-                               n_results=number_results,
-                               where= {'db_schema': db_schema },
 
-                               include=["documents", "metadatas"])
+def backfill_execution_ts(page_size: int = 1000) -> int:
+    """
+    Adds 'execution_ts' to older entries. Entries with an unreadable 'execution_date' are logged
+    and skipped; a collection is marked once done, later starts do not scan it again.
+    """
 
-    except Exception as e:
-        print(f"ChromaDB - Error: {e}", file=sys.stderr)
+    updated = 0
+
+    for name in AUDIT_COLLECTIONS:
+
+        collection = vector_store.collection(name)
+        if (collection.metadata or {}).get(BACKFILL_DONE):
+            continue
+
+        offset = 0
+
+        while True:
+            page = collection.get(limit=page_size, offset=offset, include=["metadatas"])
+            if not page['ids']:
+                break
+
+            ids, metadatas = [], []
+            for entry_id, metadata in zip(page['ids'], page['metadatas']):
+                if 'execution_ts' in metadata or not metadata.get('execution_date'):
+                    continue
+                try:
+                    execution_ts = datetime.datetime.fromisoformat(str(metadata['execution_date'])).timestamp()
+                except ValueError as e:
+                    logger.error(f"ChromaDB - {name}: no execution_ts for entry {entry_id}: {e}")
+                    continue
+                ids.append(entry_id)
+                metadatas.append({'execution_ts': execution_ts})
+
+            if ids:
+                collection.update(ids=ids, metadatas=metadatas)
+                updated += len(ids)
+
+            offset += len(page['ids'])
+
+        ## The HNSW settings cannot be changed after creation, they are not passed again
+
+        collection.modify(metadata={**{key: value for key, value in (collection.metadata or {}).items()
+                                       if not key.startswith("hnsw:")},
+                                    BACKFILL_DONE: True})
+
+    return updated
+
+
+def _to_timestamp(date_text: str, end_of_day: bool = False) -> float:
+
+    date = datetime.datetime.fromisoformat(date_text)
+    if end_of_day and len(date_text) <= 10:
+        date += datetime.timedelta(days=1, microseconds=-1)
+
+    return date.timestamp()
+
+
+def _audit_filter(db_schema: str, user: str, date_from: str, date_to: str) -> dict:
+
+    conditions = [{'db_schema': db_schema}]
+
+    if user:
+        conditions.append({'user': user.lower()})
+    if date_from:
+        conditions.append({'execution_ts': {'$gte': _to_timestamp(date_from)}})
+    if date_to:
+        conditions.append({'execution_ts': {'$lte': _to_timestamp(date_to, end_of_day=True)}})
+
+    return conditions[0] if len(conditions) == 1 else {'$and': conditions}
+
+
+def _audit_entry(entry_id: str, document: str, metadata: dict, distance: float = None) -> dict:
+
+    entry = {
+        "id": entry_id,
+        "question": document,
+        "sql": metadata.get('sql', ''),
+        "db_schema": metadata.get('db_schema', ''),
+        "user": metadata.get('user', ''),
+        "execution_date": metadata.get('execution_date', ''),
+    }
+    if distance is not None:
+        entry["distance"] = float(distance)
+
+    return entry
+
+
+##########################################################################
+## Semantic search: nearest questions first, the cursor is the offset  ##
+##########################################################################
 
-    ## ChromaDB cannot sort like 'ORDER BY'
+def _semantic_search(collection, search_text: str, where: dict, number_results: int, cursor: str) -> dict:
 
-    print(result)
+    offset = int(cursor) if cursor else 0
 
-    combined = list(zip(
-        result['ids'][0],
-        result['documents'][0],
-        result['metadatas'][0],
-    ))
-    sorted_combined = sorted(combined, key=lambda x: datetime.datetime.fromisoformat(x[2]['execution_date']), reverse=True)
+    tmp = collection.query(query_embeddings=embedding_cache.embed([search_text]),
+                           n_results=offset + number_results + 1,
+                           where=where,
+                           include=["documents", "metadatas", "distances"])
 
-    result['ids'][0], result['documents'][0], result['metadatas'][0] = map(list, zip(*sorted_combined))
+    entries = [_audit_entry(entry_id, document, metadata, distance)
+               for entry_id, document, metadata, distance
+               in zip(tmp['ids'][0], tmp['documents'][0], tmp['metadatas'][0], tmp['distances'][0])]
 
-    return sorted_combined
\ No newline at end of file
+    page = entries[offset:offset + number_results]
+    has_more = len(entries) > offset + number_results
+
+    return {"results": page, "next_cursor": str(offset + number_results) if has_more else ""}
+
+
+##########################################################################
+## Keyword search and browsing: newest first, the cursor is the        ##
+## execution timestamp and ID of the last entry returned ('ts|id')     ##
+##########################################################################
+
+def _after_cursor(entry_id: str, metadata: dict, last_ts: float, last_id: str) -> bool:
+
+    ## Entries sharing the timestamp of the last entry are ordered by ID
+
+    execution_ts = metadata.get('execution_ts', 0.0)
+
+    return execution_ts < last_ts or (execution_ts == last_ts and entry_id > last_id)
+
+
+def _search_by_date(collection, keyword: str, db_schema: str, user: str, date_from: str, date_to: str,
+                    number_results: int, cursor: str) -> dict:
+
+    last_ts, last_id = None, ""
+    if cursor:
+        ts_text, _, last_id = cursor.partition("|")
+        last_ts = float(ts_text)
+
+    ## The cursor is applied here, not in the filter: entries without 'execution_ts' are ordered last
+
+    where = _audit_filter(db_schema, user, date_from, date_to)
+    where_document = {'$contains': keyword} if keyword else None
+
+    ## Only the (small) metadata is read for ordering, documents are fetched for the page only
+
+    candidates = collection.get(where=where, where_document=where_document, include=["metadatas"])
+    ordered = sorted(((entry_id, metadata) for entry_id, metadata in zip(candidates['ids'], candidates['metadatas'])
+                      if last_ts is None or _after_cursor(entry_id, metadata, last_ts, last_id)),
+                     key=lambda entry: (-entry[1].get('execution_ts', 0.0), entry[0]))
+
+    page_ids = [entry_id for entry_id, metadata in ordered[:number_results]]
+    if not page_ids:
+        return {"results": [], "next_cursor": ""}
+
+    page = collection.get(ids=page_ids, include=["documents", "metadatas"])
+    by_id = {entry_id: (document, metadata)
+             for entry_id, document, metadata in zip(page['ids'], page['documents'], page['metadatas'])}
+
+    entries = [_audit_entry(entry_id, *by_id[entry_id]) for entry_id in page_ids]
+    has_more = len(ordered) > number_results
+
+    next_cursor = ""
+    if has_more:
+        cursor_id, cursor_metadata = ordered[number_results - 1]
+        next_cursor = f"{cursor_metadata.get('execution_ts', 0.0)!r}|{cursor_id}"
+
+    return {"results": entries, "next_cursor": next_cursor}
+
+
+def text_to_sql_audit(search_text: str, db_schema: str, number_results: int = 5, search_mode: str = "semantic",
+                      user: str = "", date_from: str = "", date_to: str = "", cursor: str = "") -> dict:
+    """
+    Searches the SQL history of a database schema.
+    'semantic': nearest questions to the search text first; 'keyword': questions containing the
+    search text, newest first. Without search text, the newest entries are returned.
+    """
+
+    search_text = search_text.strip()
+    if search_text == "*":
+        search_text = ""
+
+    try:
+        collection = vector_store.collection('SQL_Audit', create=False)
+
+        with metrics.span("vectordb.audit_search", mode=search_mode.lower()):
+            if search_text and search_mode.lower() != "keyword":
+                where = _audit_filter(db_schema, user, date_from, date_to)
+                return _semantic_search(collection, search_text, where, number_results, cursor)
+
+            return _search_by_date(collection, search_text, db_schema, user, date_from, date_to, number_results, cursor)
+
+    except Exception as e:
+        logger.error(f"ChromaDB - Error: {e}")
+        return {"results": [], "next_cursor": "", "error": str(e)}
@@ -5,8 +5,7 @@
 ## Version 1.0.0 DirkB@Exasol : Initial version             ##
 ##############################################################
 
-import chromadb
-import re
+import threading
 import time
 
 from datetime import datetime
@@ -25,13 +24,35 @@ from exasol_mcp_server_governed_sql.intro import (
     LOGGING,
     LOGGING_MODE
 )
-from exasol_mcp_server_governed_sql.helpers import elapsed_time
-from exasol_mcp_server_governed_sql.llm import invoke_llm
+from exasol_mcp_server_governed_sql.audit_writer import audit_writer
+from exasol_mcp_server_governed_sql.embedding_cache import embedding_cache
+from exasol_mcp_server_governed_sql.few_shot import format_examples, retrieve_examples
+from exasol_mcp_server_governed_sql.helpers import current_db_user, elapsed_time
+from exasol_mcp_server_governed_sql.llm import ainvoke_llm
 from exasol_mcp_server_governed_sql.helpers import set_logging_label
-from exasol_mcp_server_governed_sql.database_functions import t2s_database_schema
-from exasol_mcp_server_governed_sql.database_functions import get_sql_query_type
+from exasol_mcp_server_governed_sql.metrics import metrics, timed_node
+from exasol_mcp_server_governed_sql.database_functions import (
+    exclusive_connection,
+    fetch_limited,
+    result_cache,
+    result_cache_key,
+    run_db_call,
+    t2s_database_schema,
+    t2s_schema_fingerprint,
+    t2s_schema_metadata
+)
+from exasol_mcp_server_governed_sql.database_functions import (
+    get_sql_tables,
+    is_allowed_query,
+    parse_sql,
+    validate_sql
+)
 from exasol_mcp_server_governed_sql.load_prompts import load_translation_prompt
 from exasol_mcp_server_governed_sql.load_prompts import load_render_prompt
+from exasol_mcp_server_governed_sql.load_prompts import load_repair_prompt
+from exasol_mcp_server_governed_sql.relevance import question_relevance
+from exasol_mcp_server_governed_sql.rendering import render_result
+from exasol_mcp_server_governed_sql.vectordb import vector_store
 from exasol_mcp_server_governed_sql.info_messages_llm import (
     t2s_info_query_not_relevant,
     t2s_info_unable_query_type,
@@ -40,6 +61,7 @@ from exasol_mcp_server_governed_sql.info_messages_llm import (
 from exasol_mcp_server_governed_sql.routing import (
     t2s_check_sql_router,
     t2s_relevance_router,
+    t2s_reuse_sql_router,
     t2s_sql_valid_router,
     t2s_max_tries_router
 )
@@ -47,6 +69,53 @@ from exasol_mcp_server_governed_sql.routing import (
 exa_connection: ExaConnection = None
 
 
+#####################################################################
+## Reuse the SQL statement of a (nearly) identical, known question ##
+##-----------------------------------------------------------------##
+## Skips the relevance check and the translation by the LLM if    ##
+## the same user asked the question before for the unchanged      ##
+## database schema. Off unless EXA_MCP_VECTORDB_REUSE_DISTANCE>0. ##
+#####################################################################
+
+async def t2s_reuse_known_sql(state: GraphState):
+
+    set_logging_label(logging=LOGGING, logger=logger, label="----- t2s_reuse_known_sql -----")
+
+    state['sql_reused'] = "NO"
+    reuse_distance = float(env['vectordb_reuse_distance'] or 0)
+
+    if reuse_distance <= 0:
+        return state
+
+    try:
+        fingerprint = await run_db_call(t2s_schema_fingerprint, connection=state['connection'], db_schema=state['db_schema'])
+        tmp = await run_db_call(_query_similar_question, state['question'],
+                                where={"$and": [{'user': current_db_user(env['db_user']).lower()},
+                                                {'db_schema': state['db_schema']},
+                                                ]
+                                       })
+    except Exception as e:
+        logger.error(f"ChromaDB - Error: {e}")
+        return state
+
+    if not tmp["distances"][0] or float(tmp["distances"][0][0]) > reuse_distance:
+        return state
+
+    if tmp['metadatas'][0][0].get('schema_fingerprint') != fingerprint:
+        if LOGGING == 'True' and LOGGING_MODE == 'debug':
+            logger.debug("Known question found, but the database schema has changed since.")
+        return state
+
+    state['sql_statement'] = tmp['metadatas'][0][0]['sql']
+    state['sql_origin'] = "reuse"
+    state['sql_reused'] = "YES"
+    state['is_relevant'] = "YES"
+
+    set_logging_label(logging=LOGGING, logger=logger, label=f"Reusing SQL of known question (Distance: {float(tmp['distances'][0][0]):.4f})")
+
+    return state
+
+
 ##################################################################
 ## Check if human question relates to requested database schema ##
 ##################################################################
@@ -56,12 +125,31 @@ class CheckIsRelevant(BaseModel):
         description="Checks, if the question is related to the database schema. 'YES' or 'NO'."
     )
 
-def t2s_check_relevance(state: GraphState) -> str:
+def _embedding_relevance(connection, db_schema: str, question: str) -> float:
+
+    columns = t2s_schema_metadata(connection=connection, db_schema=db_schema)
+    fingerprint = t2s_schema_fingerprint(connection=connection, db_schema=db_schema)
+
+    return question_relevance(question=question, db_schema=db_schema, fingerprint=fingerprint, columns=columns)
+
+async def t2s_check_relevance(state: GraphState) -> str:
 
     set_logging_label(logging=LOGGING, logger=logger, label="----- t2s_check_relevance -----")
     start_time_relevance_test = time.time()
 
-    schema = t2s_database_schema(connection=state['connection'], db_schema=state['db_schema'])
+    ## Local classifier: compare the question with the descriptions of tables and columns
+
+    if env['relevance_check'].lower() == "embedding":
+
+        score = await run_db_call(_embedding_relevance, state['connection'], state['db_schema'], state['question'])
+        state['is_relevant'] = "YES" if score >= float(env['relevance_embedding_threshold']) else "NO"
+
+        elapsed_time(logging=LOGGING, logger=logger, start_time=start_time_relevance_test, label=f"Time needed for Relevance test (Embedding-Similarity: {score:.3f})")
+
+        return state
+
+    schema = await run_db_call(t2s_database_schema, connection=state['connection'], db_schema=state['db_schema'],
+                               question=state['question'])
 
     system_prompt = f"""
     You are an assistant that checks if the given human question: 
@@ -80,13 +168,13 @@ def t2s_check_relevance(state: GraphState) -> str:
 
 
     start_time_relevance_test = time.time()
-    result = invoke_llm(base=env["llm_server_url"],
-                                      api=env["llm_server_api_token"],
-                                      model=env["llm_server_model_check"],
-                                      temperature=env['temperature_relevance_check'],
-                                      prompt=system_prompt,
-                                      query=state['question'],
-                                      output=CheckIsRelevant)
+    result = await ainvoke_llm(base=env["llm_server_url"],
+                               api=env["llm_server_api_token"],
+                               model=env["llm_server_model_check"],
+                               temperature=env['temperature_relevance_check'],
+                               prompt=system_prompt,
+                               query=state['question'],
+                               output=CheckIsRelevant)
     elapsed_time(logging=LOGGING, logger=logger, start_time=start_time_relevance_test, label="Time needed for Relevance test")
 
     state['is_relevant'] = result.is_relevant
@@ -106,7 +194,30 @@ class TransformIntoSql(BaseModel):
         description="The SQL query corresponding to the user's natural language question."
     )
 
-def t2s_human_language_to_sql(state: GraphState):
+class TransformIntoSqlIfRelevant(BaseModel):
+    is_relevant: str = Field(
+        description="Checks, if the question is related to the database schema. 'YES' or 'NO'."
+    )
+    sql_query: str = Field(
+        description="The SQL query corresponding to the user's natural language question, empty if not related."
+    )
+
+FUSED_RELEVANCE_PROMPT = """
+
+First check, if the question relates to the database schema above. Answer "is_relevant" with "YES"
+if it does, otherwise with "NO" and leave the SQL query empty.
+"""
+
+def _query_similar_question(question: str, where: dict = None) -> dict:
+
+    sql_collection = vector_store.collection("SQL_Audit")
+    question_embeddings = embedding_cache.embed([question])
+
+    with metrics.span("vectordb.query", collection="SQL_Audit"):
+        return sql_collection.query(query_embeddings=question_embeddings, n_results=1, where=where,
+                                    include=["distances", "documents", "metadatas"])
+
+async def t2s_human_language_to_sql(state: GraphState):
 
     set_logging_label(logging=LOGGING, logger=logger, label="----- t2s_human_language_to_sql -----")
 
@@ -114,48 +225,55 @@ def t2s_human_language_to_sql(state: GraphState):
 
     db_schema = state['db_schema']
 
-    schema = t2s_database_schema(connection=state['connection'], db_schema=state['db_schema'])
+    schema = await run_db_call(t2s_database_schema, connection=state['connection'], db_schema=state['db_schema'],
+                               question=state['question'])
 
     system_prompt = load_translation_prompt(db_schema=db_schema, schema=schema)
-    system_prompt_length = len(system_prompt)
 
     ##
-    ## Check VectorDB for a similar question and SQL Statement,
-    ## retrieve a threshold for similarity from the .env file
+    ## Check VectorDB for similar questions and their SQL statements (taught and audited),
+    ## retrieve a threshold for similarity from the .env file; without one, there is no cut-off
     ##
 
-    try:
-        vectordb_client = chromadb.PersistentClient(path=env['vectordb_persistent_storage'])
-        sql_collection = vectordb_client.get_or_create_collection(name="SQL_Audit")
-        tmp = sql_collection.query(query_texts=state['question'], n_results=1, include=["distances", "documents", "metadatas"])
-
-        if float(tmp["distances"][0][0]) <= float(env['vectordb_similarity_distance']):
-            system_prompt += f"""
-                                For a similar natural language question you have created the following SQL statement:
-                                
-                                {tmp['metadatas'][0][0]['sql']}
-                                
-                            """
-    except Exception as e:
-        logger.error(f"ChromaDB - Error: {e}")
+    examples = await run_db_call(retrieve_examples,
+                                 question=state['question'],
+                                 db_schema=db_schema,
+                                 top_k=int(env['fewshot_top_k']),
+                                 max_distance=float(env['vectordb_similarity_distance'] or "inf"),
+                                 token_budget=int(env['fewshot_token_budget']))
+    system_prompt += format_examples(examples)
+
+    if LOGGING == 'True' and LOGGING_MODE == 'debug':
+        logger.debug(f"Few-shot examples added to the prompt: {len(examples)}")
+
+    ## In 'fused' mode, the first translation also decides on the relevance of the question
+
+    fused_relevance_check = env['relevance_check'].lower() == "fused" and state['num_of_attempts'] == 1
+    if fused_relevance_check:
+        system_prompt += FUSED_RELEVANCE_PROMPT
+
+    system_prompt_length = len(system_prompt)
 
     if LOGGING == 'True' and LOGGING_MODE == 'debug':
         logger.debug(f"System-Prompt for translation: {system_prompt}")
 
     start_time_llm = time.time()
-    result = invoke_llm(base=env["llm_server_url"],
-                        api=env["llm_server_api_token"],
-                        model=env["llm_server_model_check"],
-                        temperature=env['temperature_translation'],
-                        prompt=system_prompt,
-                        query=state['question'],
-                        output=TransformIntoSql)
+    result = await ainvoke_llm(base=env["llm_server_url"],
+                               api=env["llm_server_api_token"],
+                               model=env["llm_server_model_check"],
+                               temperature=env['temperature_translation'],
+                               prompt=system_prompt,
+                               query=state['question'],
+                               output=TransformIntoSqlIfRelevant if fused_relevance_check else TransformIntoSql)
 
+    if fused_relevance_check:
+        state['is_relevant'] = result.is_relevant
 
 
     elapsed_time(logging=LOGGING, logger=logger, start_time=start_time_llm, label=f"Time needed for SQL Creation (Prompt-Length: {system_prompt_length})")
 
     state["sql_statement"] = result.sql_query
+    state['sql_origin'] = "translation"
 
     if LOGGING == 'True' and LOGGING_MODE == 'debug':
         sql_for_logger = format_sql(result.sql_query)
@@ -174,7 +292,11 @@ def t2s_check_sql_is_allowed(state: GraphState):
 
     set_logging_label(logging=LOGGING, logger=logger, label="----- t2s_check_sql_is_allowed -----")
 
-    if get_sql_query_type(state["sql_statement"]):
+    ## Every new SQL statement is parsed once here, the later steps work on the AST
+
+    state['sql_ast'] = parse_sql(state["sql_statement"])
+
+    if is_allowed_query(state['sql_ast']):
         state['is_allowed'] = "YES"
     else:
         state['is_allowed'] = "NO"
@@ -182,29 +304,107 @@ def t2s_check_sql_is_allowed(state: GraphState):
     return state
 
 
+##############################################################################
+## Validate tables and columns against the schema metadata before execution ##
+##############################################################################
+
+def _validate_sql(state: GraphState) -> list:
+
+    columns = t2s_schema_metadata(connection=state['connection'], db_schema=state['db_schema'])
+
+    return validate_sql(state['sql_ast'], db_schema=state['db_schema'], columns=columns)
+
+async def t2s_validate_sql(state: GraphState):
+
+    set_logging_label(logging=LOGGING, logger=logger, label="----- t2s_validate_sql -----")
+
+    state['sql_is_valid'] = "YES"
+    state['sql_error'] = "None"
+
+    if env['validate_sql'] != 'True':
+        return state
+
+    errors = await run_db_call(_validate_sql, state)
+
+    ## Errors are treated like errors of the database and go straight into the retry path
+
+    if errors:
+        state['sql_is_valid'] = "NO"
+        state['sql_error'] = " ".join(errors)
+        logger.error(f"SQL Validation Error: {state['sql_error']}")
+        _record_attempt(state)
+
+    return state
+
+
 #######################
 ## Execute the query ##
 #######################
 
-def t2s_execute_query(state: GraphState):
+async def t2s_execute_query(state: GraphState):
 
     set_logging_label(logging=LOGGING, logger=logger, label="----- t2s_execute_query -----")
+
+    ## The result cache is keyed by the database user the query runs as, known in the request context only
+
+    cache_key = None
+    if state.get('use_result_cache', True) and result_cache.enabled:
+        cache_key = result_cache_key(state['sql_ast'], state['db_schema'], current_db_user(env['db_user']))
+
+    return await run_db_call(_execute_query, state, cache_key)
+
+
+def _execute_query(state: GraphState, cache_key: tuple = None):
+
     connection = state['connection']
 
     try:
 
-        start_time_exa_query = time.time()
+        cached = result_cache.get(cache_key) if cache_key is not None else None
+        state['result_cache_hit'] = cached is not None
+
+        if cached is not None:
+
+            col_names, rows, num_rows, truncated = cached['columns'], cached['rows'], cached['num_rows'], cached['truncated']
+            metrics.inc("t2s_result_cache_total", help_text="Lookups of the result cache", result="hit")
+            set_logging_label(logging=LOGGING, logger=logger, label="Result served from the result cache")
+
+        else:
+
+            start_time_exa_query = time.time()
+
+            ## The connection is held until the preview is fetched and the statement is closed
+
+            with metrics.span("exasol.query"), exclusive_connection():
+                statement = connection.execute_query(state['sql_statement'])
 
-        statement = connection.execute_query(state['sql_statement'])
-        rows = statement.fetchall()
+                ## Only a bounded preview of the result set is kept, the row count is the one of the full result
 
-        elapsed_time(logging=LOGGING, logger=logger, start_time=start_time_exa_query, label="Elapsed Time on Exasol-DB - Execute Query")
+                col_names = statement.column_names()
+                num_rows = statement.rowcount()
+                rows, truncated = fetch_limited(statement,
+                                                max_rows=int(env['result_max_rows']),
+                                                max_bytes=int(env['result_max_bytes']))
 
-        col_names = statement.column_names()
-        rows.insert(0, col_names)
+            elapsed_time(logging=LOGGING, logger=logger, start_time=start_time_exa_query, label="Elapsed Time on Exasol-DB - Execute Query")
 
-        state['query_result'] = str(rows)
-        state['query_num_rows'] = statement.rowcount()
+            if cache_key is not None:
+                metrics.inc("t2s_result_cache_total", help_text="Lookups of the result cache", result="miss")
+                result_cache.put(cache_key,
+                                 {'columns': col_names, 'rows': rows, 'num_rows': num_rows, 'truncated': truncated},
+                                 size=len(repr(rows)))
+
+        if truncated:
+            set_logging_label(logging=LOGGING, logger=logger, label=f"Result set truncated to {len(rows)} of {num_rows} rows")
+
+        state['query_columns'] = col_names
+        state['query_rows'] = rows
+        state['query_num_rows'] = num_rows
+        state['query_truncated'] = truncated
+
+        ## The result as text is only needed for the prompt of the LLM rendering
+
+        state['query_result'] = str([col_names] + rows) if env['result_rendering'].lower() == "llm" else ""
 
     except ExaError as e:
         state['sql_is_valid'] = "NO"
@@ -216,66 +416,22 @@ def t2s_execute_query(state: GraphState):
 
         ## Store the generated SQL statement and the natural language question into a VectorDB
         ## We will use it for similarity search and may add this query to the prompt for future
-        ## natural language questions
+        ## natural language questions. The audit writer persists it in the background.
 
         if rows is not None:
             if LOGGING == 'True' and LOGGING_MODE == 'debug':
-                logger.debug("STEP: Storing or updating SQL statement in Vector-DB.")
-
-            vectordb_client = chromadb.PersistentClient(path=env['vectordb_persistent_storage'])
-            sql_collection = vectordb_client.get_or_create_collection(name="SQL_Audit")
-
-            ## Check, if query exists in VectorDB
-
-            start_time_chroma = time.time()
-
-            tmp = sql_collection.query(query_texts=state['question'], n_results=1,
-                                       include=["distances", "documents", "metadatas"],
-                                       where={"$and": [{'user': env['db_user'].lower()},
-                                                       {'db_schema': state['db_schema']},
-                                                       ]
-                                              },
-                                       )
-
-            ## VectorDB is empty, no distances stored:
-
-            if not tmp["distances"][0]:
-                new_idx = sql_collection.count() + 1
-                sql_collection.add(
-                    documents=[state['question']],
-                    metadatas=[{"sql": state['sql_statement'],
-                                "execution_date": str(datetime.now()),
-                                "db_schema": state['db_schema'],
-                                "user": env['db_user'].lower(),
-                                "origin": "text-to-sql"}],
-                    ids=[f"{new_idx}"]
-                )
-                if LOGGING == 'True' and LOGGING_MODE == 'debug':
-                    logger.debug("STEP: Vector-DB-SQL initially written")
-
-            elif float(tmp["distances"][0][0]) > 0.0001:
-
-                    new_idx = sql_collection.count() + 1
-                    sql_collection.add(
-                        documents=[state['question']],
-                        metadatas=[{"sql": state['sql_statement'],
-                                    "execution_date": str(datetime.now()),
-                                    "db_schema": state['db_schema'],
-                                    "user": env['db_user'].lower(),
-                                    "origin": "text-to-sql"}],
-                        ids=[f"{new_idx}"]
-                    )
-                    if LOGGING == 'True' and LOGGING_MODE == 'debug':
-                        logger.debug("STEP: Vector-DB-SQL written")
-            else:
-                sql_collection.update(
-                    ids=[ tmp['ids'][0][0] ],
-                    metadatas=[ {"execution_date": str(datetime.now())} ]
-                )
-                if LOGGING == 'True' and LOGGING_MODE == 'debug':
-                    logger.debug("STEP: Vector-DB-SQL initially updated")
-
-            elapsed_time(logging=LOGGING, logger=logger, start_time=start_time_chroma, label="Elapsed Time on VectorDB")
+                logger.debug("STEP: Queueing SQL statement for Vector-DB.")
+
+            execution_date = datetime.now()
+
+            audit_writer.submit({"question": state['question'],
+                                 "sql": state['sql_statement'],
+                                 "execution_date": str(execution_date),
+                                 "execution_ts": execution_date.timestamp(),
+                                 "db_schema": state['db_schema'],
+                                 "user": current_db_user(env['db_user']).lower(),
+                                 "schema_fingerprint": t2s_schema_fingerprint(connection=connection,
+                                                                              db_schema=state['db_schema'])})
 
     return state
 
@@ -284,6 +440,36 @@ def t2s_execute_query(state: GraphState):
 ## Check, if the SQL statement execution was correct or raised an error ##
 ##########################################################################
 
+attempt_statistics: dict = {}
+_attempt_statistics_lock = threading.Lock()
+
+
+def _record_attempt(state: GraphState) -> None:
+
+    key = (state['sql_origin'], state['num_of_attempts'])
+    succeeded = state['sql_is_valid'] == "YES"
+
+    state['attempt_history'].append({"attempt": state['num_of_attempts'],
+                                     "origin": state['sql_origin'],
+                                     "sql_is_valid": state['sql_is_valid']})
+
+    with _attempt_statistics_lock:
+        counts = attempt_statistics.setdefault(key, {"success": 0, "failure": 0})
+        counts["success" if succeeded else "failure"] += 1
+
+    metrics.inc("t2s_attempts_total", help_text="Executions of SQL statements per origin and attempt number",
+                origin=state['sql_origin'], attempt=state['num_of_attempts'],
+                result="success" if succeeded else "failure")
+
+
+def t2s_attempt_statistics() -> list:
+    """ Successful and failed executions per origin of the SQL statement and attempt number. """
+
+    with _attempt_statistics_lock:
+        return [{"origin": origin, "attempt": attempt, **counts}
+                for (origin, attempt), counts in sorted(attempt_statistics.items())]
+
+
 def t2s_check_sql_valid(state: GraphState):
 
     if state['sql_error'] == "None":
@@ -291,6 +477,11 @@ def t2s_check_sql_valid(state: GraphState):
     else:
         state['sql_is_valid'] = "NO"
 
+    _record_attempt(state)
+
+    if LOGGING == 'True' and LOGGING_MODE == 'debug':
+        logger.debug(f"Attempt {state['num_of_attempts']} ({state['sql_origin']}): SQL valid: {state['sql_is_valid']}")
+
     return state
 
 
@@ -303,19 +494,35 @@ class DisplayResult(BaseModel):
         description="The result set converted into a nice and shiny table in MARKDOWN syntax."
     )
 
-def t2s_show_answer(state: GraphState):
+async def t2s_show_answer(state: GraphState):
 
     set_logging_label(logging=LOGGING, logger=logger, label="----- t2s_show_answer -----")
 
+    start_time_render = time.time()
+
+    ## By default, the result set is rendered locally; the LLM is used on request only, e.g. for narrative summaries
+
+    if env['result_rendering'].lower() != "llm":
+
+        state["display_result"] = render_result(result_format=env['result_rendering'],
+                                                columns=state['query_columns'],
+                                                rows=state['query_rows'],
+                                                num_rows=state['query_num_rows'],
+                                                truncated=state['query_truncated'])
 
-    result = re.search(r"(\[.*\])", state['query_result'])
-    result_set = result.group(0)
+        elapsed_time(logging=LOGGING, logger=logger, start_time=start_time_render, label=f"Time needed for rendering answer ({env['result_rendering']})")
+
+        return state
+
+    result_set = state['query_result']
 
     system_prompt = load_render_prompt(db_schema=state['db_schema'])
     system_prompt_length = len(system_prompt)
 
-    question = f"""Transform the dataset below into a table in markdown syntax. For a result
-    with one value only, build a table with one column:
+    question = f"""The question was: {state['question']}
+    
+    Summarize the answer to this question and transform the dataset below into a table in markdown syntax. 
+    For a result with one value only, build a table with one column:
     
     {result_set}
     """
@@ -324,14 +531,13 @@ def t2s_show_answer(state: GraphState):
         logger.debug(f"System-Prompt: \n \n {system_prompt} \n\n")
         logger.debug(f"Question:: \n \n {question} \n\n")
 
-    start_time_render = time.time()
-    result = invoke_llm(base=env["llm_server_url"],
-                        api=env["llm_server_api_token"],
-                        model=env["llm_server_model_check"],
-                        temperature=env['temperature_rendering'],
-                        prompt=system_prompt,
-                        query=state['question'],
-                        output=DisplayResult)
+    result = await ainvoke_llm(base=env["llm_server_url"],
+                               api=env["llm_server_api_token"],
+                               model=env["llm_server_model_check"],
+                               temperature=env['temperature_rendering'],
+                               prompt=system_prompt,
+                               query=question,
+                               output=DisplayResult)
 
     state["display_result"] = str(result.display_result)
 
@@ -348,7 +554,7 @@ class NewVariantOfQuestion(BaseModel):
     new_question: str = Field(
         description="Reformulated Question to gain a valid SQL transformation."
     )
-def t2s_correct_query(state: GraphState):
+async def t2s_correct_query(state: GraphState):
 
     set_logging_label(logging=LOGGING, logger=logger, label="----- t2s_correct_query -----")
 
@@ -358,13 +564,13 @@ def t2s_correct_query(state: GraphState):
     info_message = f"Rewrite the following question: {state['question']} "
 
     start_time_rewrite = time.time()
-    result = invoke_llm(base=env["llm_server_url"],
-                        api=env["llm_server_api_token"],
-                        model=env["llm_server_model_check"],
-                        temperature=env['temperature_query_rewrite'],
-                        prompt=system_prompt,
-                        query=info_message,
-                        output=NewVariantOfQuestion)
+    result = await ainvoke_llm(base=env["llm_server_url"],
+                               api=env["llm_server_api_token"],
+                               model=env["llm_server_model_check"],
+                               temperature=env['temperature_query_rewrite'],
+                               prompt=system_prompt,
+                               query=info_message,
+                               output=NewVariantOfQuestion)
     elapsed_time(logging=LOGGING, logger=logger, start_time=start_time_rewrite, label="Time needed for rewriting question")
     state["question"] = result.new_question
 
@@ -374,6 +580,56 @@ def t2s_correct_query(state: GraphState):
 
 
 
+################################################################
+## Repair the failing SQL statement with the error of Exasol ##
+################################################################
+
+class RepairedSql(BaseModel):
+    sql_query: str = Field(
+        description="The corrected SQL query, fixing the error reported by the database."
+    )
+
+async def t2s_repair_sql(state: GraphState):
+
+    set_logging_label(logging=LOGGING, logger=logger, label="----- t2s_repair_sql -----")
+
+    state['num_of_attempts'] += 1
+
+    ## The known tables of the failing statement and the tables related to the question go into the prompt,
+    ## all tables (within the budget) if there are none or the statement cannot be parsed
+
+    tables = get_sql_tables(state['sql_ast'])
+    schema = await run_db_call(t2s_database_schema, connection=state['connection'], db_schema=state['db_schema'],
+                               tables=tables, question=state['question'])
+
+    system_prompt = load_repair_prompt(db_schema=state['db_schema'],
+                                       schema=schema,
+                                       sql_statement=state['sql_statement'],
+                                       sql_error=state['sql_error'])
+    system_prompt_length = len(system_prompt)
+
+    if LOGGING == 'True' and LOGGING_MODE == 'debug':
+        logger.debug(f"System-Prompt for repair: {system_prompt}")
+
+    start_time_repair = time.time()
+    result = await ainvoke_llm(base=env["llm_server_url"],
+                               api=env["llm_server_api_token"],
+                               model=env["llm_server_model_check"],
+                               temperature=env['temperature_translation'],
+                               prompt=system_prompt,
+                               query=state['question'],
+                               output=RepairedSql)
+    elapsed_time(logging=LOGGING, logger=logger, start_time=start_time_repair, label=f"Time needed for SQL Repair (Prompt-Length: {system_prompt_length})")
+
+    state["sql_statement"] = result.sql_query
+    state['sql_origin'] = "repair"
+
+    if LOGGING == 'True' and LOGGING_MODE == 'debug':
+        logger.debug(f"SQL repaired: \n \n {format_sql(result.sql_query)} \n\n")
+
+    return state
+
+
 def t2s_check_max_tries(state: GraphState) -> str:
     return state
 
@@ -384,33 +640,44 @@ def t2s_sql_execution_router(state: GraphState):
 ## The Process Flow to create transformation of natural language into SQL ##
 ############################################################################
 
-async def t2s_start_process(state: GraphState):
+_t2s_process = None
+_t2s_process_lock = threading.Lock()
 
-    ## Create a connection to the Exasol database ##
 
-    total_start_time = time.time()
+def _build_t2s_workflow():
 
-    set_logging_label(logging=LOGGING, logger=logger, label="########## Begin of Translation Process ##########")
+    workflow = StateGraph(GraphState)
 
-    state['is_allowed'] = "NO"
-    state['sql_is_valid'] = "NO"
-    state['num_of_attempts'] = 0
-    state['display_result'] = ""
+    ## Every node is timed as a span of its own, see metrics.py
 
-    workflow = StateGraph(GraphState)
+    workflow.add_edge(START, "reuse_known_sql")
+    workflow.add_node("reuse_known_sql", timed_node("reuse_known_sql", t2s_reuse_known_sql))
+    workflow.add_node("check_relevance", timed_node("check_relevance", t2s_check_relevance))
+    workflow.add_node("transform_into_sql", timed_node("transform_into_sql", t2s_human_language_to_sql))
+    workflow.add_node("info_unable_query_type", timed_node("info_unable_query_type", t2s_info_unable_query_type))
+    workflow.add_node("check_sql_is_allowed", timed_node("check_sql_is_allowed", t2s_check_sql_is_allowed))
+    workflow.add_node("validate_sql", timed_node("validate_sql", t2s_validate_sql))
+    workflow.add_node("execute_query", timed_node("execute_query", t2s_execute_query))
+    workflow.add_node("show_answer", timed_node("show_answer", t2s_show_answer))
+    workflow.add_node("info_query_not_relevant", timed_node("info_query_not_relevant", t2s_info_query_not_relevant))
+    workflow.add_node("correct_query", timed_node("correct_query", t2s_correct_query))
+    workflow.add_node("repair_sql", timed_node("repair_sql", t2s_repair_sql))
+    workflow.add_node("check_max_tries", timed_node("check_max_tries", t2s_check_max_tries))
+    workflow.add_node("info_unable_create_sql", timed_node("info_unable_create_sql", t2s_info_unable_create_sql))
+    workflow.add_node("check_sql_valid", timed_node("check_sql_valid", t2s_check_sql_valid))
+
+    ## 'fused': the translation decides on the relevance as well, no separate relevance check
 
-    workflow.add_edge(START, "check_relevance")
-    workflow.add_node("check_relevance", t2s_check_relevance)
-    workflow.add_node("transform_into_sql", t2s_human_language_to_sql)
-    workflow.add_node("info_unable_query_type", t2s_info_unable_query_type)
-    workflow.add_node("check_sql_is_allowed", t2s_check_sql_is_allowed)
-    workflow.add_node("execute_query", t2s_execute_query)
-    workflow.add_node("show_answer", t2s_show_answer)
-    workflow.add_node("info_query_not_relevant", t2s_info_query_not_relevant)
-    workflow.add_node("correct_query", t2s_correct_query)
-    workflow.add_node("check_max_tries", t2s_check_max_tries)
-    workflow.add_node("info_unable_create_sql", t2s_info_unable_create_sql)
-    workflow.add_node("check_sql_valid", t2s_check_sql_valid)
+    fused_relevance_check = env['relevance_check'].lower() == "fused"
+
+    workflow.add_conditional_edges(
+        "reuse_known_sql",
+        t2s_reuse_sql_router,
+        {
+            "YES": "check_sql_is_allowed",
+            "NO": "transform_into_sql" if fused_relevance_check else "check_relevance",
+        },
+    )
 
     workflow.add_conditional_edges(
         "check_relevance",
@@ -421,27 +688,48 @@ async def t2s_start_process(state: GraphState):
         },
     )
 
+    ## 'repair': fix the failing statement with the database error, 'rewrite': rephrase the question and translate again
+
     workflow.add_conditional_edges(
         "check_max_tries",
         t2s_max_tries_router,
         {
-            "NO": "correct_query",
+            "NO": "repair_sql" if env['retry_strategy'].lower() == "repair" else "correct_query",
             "YES": "info_unable_create_sql"
         }
 
     )
 
-    workflow.add_edge("transform_into_sql", "check_sql_is_allowed")
+    if fused_relevance_check:
+        workflow.add_conditional_edges(
+            "transform_into_sql",
+            t2s_relevance_router,
+            {
+                "YES": "check_sql_is_allowed",
+                "NO": "info_query_not_relevant",
+            },
+        )
+    else:
+        workflow.add_edge("transform_into_sql", "check_sql_is_allowed")
 
     workflow.add_conditional_edges(
         "check_sql_is_allowed",
         t2s_check_sql_router,
         {
-            "YES": "execute_query",
+            "YES": "validate_sql",
             "NO": "info_unable_query_type",
         }
     )
 
+    workflow.add_conditional_edges(
+        "validate_sql",
+        t2s_sql_valid_router,
+        {
+            "YES": "execute_query",
+            "NO": "check_max_tries"
+        }
+    )
+
     workflow.add_edge("execute_query", "check_sql_valid")
 
     workflow.add_conditional_edges(
@@ -455,17 +743,49 @@ async def t2s_start_process(state: GraphState):
 
     workflow.add_edge("show_answer", END)
     workflow.add_edge("correct_query", "transform_into_sql")
+    workflow.add_edge("repair_sql", "check_sql_is_allowed")
     workflow.add_edge("info_query_not_relevant", END)
     workflow.add_edge("info_unable_create_sql", END)
 
-    t2s_process = workflow.compile()
+    return workflow.compile()
 
-    state = await t2s_process.ainvoke(state)
+
+def get_t2s_process():
+    """
+    Returns the compiled Text-to-SQL workflow. The graph is built and compiled once,
+    either at server startup or on first use, and shared by all requests.
+    """
+
+    global _t2s_process
+
+    if _t2s_process is None:
+        with _t2s_process_lock:
+            if _t2s_process is None:
+                _t2s_process = _build_t2s_workflow()
+
+    return _t2s_process
+
+
+async def t2s_start_process(state: GraphState):
+
+    total_start_time = time.time()
+
+    set_logging_label(logging=LOGGING, logger=logger, label="########## Begin of Translation Process ##########")
+
+    state['is_allowed'] = "NO"
+    state['sql_is_valid'] = "NO"
+    state['num_of_attempts'] = 0
+    state['display_result'] = ""
+    state['sql_reused'] = "NO"
+    state['sql_origin'] = ""
+    state['attempt_history'] = []
+    state['result_cache_hit'] = False
+
+    with metrics.span("request"):
+        state = await get_t2s_process().ainvoke(state)
 
     set_logging_label(logging=LOGGING, logger=logger, label="\n")
     elapsed_time(logging=LOGGING, logger=logger, start_time=total_start_time, label="Total Time")
     set_logging_label(logging=LOGGING, logger=logger, label="########## End of Translation Process #########\n\n\n")
 
     return state
-
-
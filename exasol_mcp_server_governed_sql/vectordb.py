@@ -0,0 +1,84 @@
+##############################################################
+## Exasol MCP server with Text-to-SQL query option          ##
+## Module: Process-wide VectorDB (ChromaDB) handle          ##
+##----------------------------------------------------------##
+## Version 1.0.0 DirkB@Exasol : Initial version             ##
+##############################################################
+
+import hashlib
+import threading
+
+from exasol_mcp_server_governed_sql.intro import env, logger
+
+
+class VectorStore:
+    """
+    Opens the persistent ChromaDB store once per process and keeps the collection
+    objects, so requests do not reload the SQLite store and the HNSW index.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._client = None
+        self._collections: dict = {}
+        self._lock = threading.Lock()
+
+    def open(self):
+
+        with self._lock:
+            if self._client is None:
+                ## Imported here, ChromaDB takes a while to load and is not needed before the first use
+                import chromadb
+                self._client = chromadb.PersistentClient(path=self.path)
+
+        return self._client
+
+    def collection(self, name: str, create: bool = True):
+
+        collection = self._collections.get(name)
+        if collection is not None:
+            return collection
+
+        client = self.open()
+
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                if create:
+                    collection = client.get_or_create_collection(name=name)
+                else:
+                    collection = client.get_collection(name=name)
+                self._collections[name] = collection
+
+        return collection
+
+    def close(self) -> None:
+
+        with self._lock:
+            if self._client is None:
+                return
+            try:
+                self._client.clear_system_cache()
+            except Exception as e:
+                logger.error(f"ChromaDB - Error on shutdown: {e}")
+            self._client = None
+            self._collections.clear()
+
+
+def normalize_question(question: str) -> str:
+
+    return " ".join(question.lower().split())
+
+
+def vector_entry_id(question: str, db_schema: str, user: str) -> str:
+    """
+    Deterministic ID of a question/SQL entry: the same normalized question of the same
+    user on the same schema always maps to the same entry.
+    """
+
+    key = "\x1f".join([normalize_question(question), db_schema.upper(), user.lower()])
+
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+vector_store = VectorStore(path=env['vectordb_persistent_storage'])
@@ -0,0 +1,6 @@
+import os
+
+## The server reads its environment on import; the unit tests need no database, LLM or VectorDB
+
+os.environ.setdefault("EXA_MCP_LOGGER", "False")
+os.environ.setdefault("EXA_MCP_LOGGER_MODE", "info")
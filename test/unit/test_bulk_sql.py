@@ -0,0 +1,22 @@
+import pytest
+
+from exasol_mcp_server_governed_sql.bulk_sql import _pair_record
+
+
+def test_pair_record_coerces_scalar_values():
+
+    record = _pair_record('{"question": 42, "sql": "SELECT 1", "db_schema": null}', "RETAIL")
+
+    assert record == {"question": "42", "sql_statement": "SELECT 1", "db_schema": "RETAIL"}
+
+
+def test_pair_record_rejects_nested_values():
+
+    with pytest.raises(ValueError, match="question"):
+        _pair_record('{"question": {"text": "x"}, "sql": "SELECT 1"}', "RETAIL")
+
+
+def test_pair_record_rejects_missing_sql():
+
+    with pytest.raises(ValueError, match="sql_statement"):
+        _pair_record('{"question": "How many?"}', "RETAIL")
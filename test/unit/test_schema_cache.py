@@ -0,0 +1,44 @@
+from exasol_mcp_server_governed_sql.schema_cache import SchemaCache
+
+
+def _metadata(*columns) -> dict:
+
+    return {'columns': list(columns), 'fingerprint': repr(columns)}
+
+
+def test_cached_per_schema_and_user():
+
+    cache = SchemaCache(ttl=300)
+    loads = []
+
+    def loader(user: str):
+        def load():
+            loads.append(user)
+            return _metadata(("T", f"C_{user}", "DATE", None))
+        return load
+
+    first = cache.get_or_load(("RETAIL", "alice"), loader("alice"))
+    second = cache.get_or_load(("RETAIL", "bob"), loader("bob"))
+
+    assert first != second
+    assert cache.get_or_load(("RETAIL", "alice"), loader("alice")) == first
+    assert loads == ["alice", "bob"]
+
+
+def test_empty_metadata_is_not_cached():
+
+    cache = SchemaCache(ttl=300)
+
+    assert cache.get_or_load(("RETAIL", "alice"), lambda: _metadata())['columns'] == []
+    assert cache.get_or_load(("RETAIL", "alice"), lambda: _metadata(("T", "C", "DATE", None)))['columns'] != []
+
+
+def test_invalidate_drops_the_schema_of_all_users():
+
+    cache = SchemaCache(ttl=300)
+    for key in (("RETAIL", "alice"), ("RETAIL", "bob"), ("HR", "alice")):
+        cache.get_or_load(key, lambda: _metadata(("T", "C", "DATE", None)))
+
+    cache.invalidate("retail")
+
+    assert cache.stats()["schemas"] == ["HR"]
@@ -0,0 +1,72 @@
+import pytest
+
+from exasol_mcp_server_governed_sql.database_functions import _unresolved_columns, parse_sql, validate_sql
+
+
+DB_SCHEMA = "RETAIL"
+
+COLUMNS = [
+    ("CUSTOMERS", "ID", "DECIMAL(18,0)", None),
+    ("CUSTOMERS", "NAME", "VARCHAR(200) UTF8", "Name of the customer"),
+    ("SALES", "ID", "DECIMAL(18,0)", None),
+    ("SALES", "CUSTOMER_ID", "DECIMAL(18,0)", None),
+    ("SALES", "SALES_DATE", "DATE", None),
+    ("SALES", "AMOUNT", "DECIMAL(18,2)", None),
+]
+
+
+def _validate(query: str) -> list:
+
+    ast = parse_sql(query)
+    assert ast is not None
+
+    return validate_sql(ast, db_schema=DB_SCHEMA, columns=COLUMNS)
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT ID, NAME FROM CUSTOMERS",
+    'SELECT "ID", "NAME" FROM "CUSTOMERS"',
+    "SELECT c.NAME, SUM(s.AMOUNT) FROM RETAIL.CUSTOMERS c JOIN SALES s ON s.CUSTOMER_ID = c.ID GROUP BY c.NAME",
+    "WITH recent AS (SELECT * FROM SALES WHERE SALES_DATE > ADD_DAYS(CURRENT_DATE, -7)) SELECT COUNT(*) FROM recent",
+])
+def test_known_tables_and_columns(query):
+
+    assert _validate(query) == []
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT SYSDATE, NAME FROM CUSTOMERS",
+    "SELECT NAME FROM CUSTOMERS WHERE SYSTIMESTAMP > ADD_DAYS(SYSTIMESTAMP, -1)",
+    "SELECT NAME FROM CUSTOMERS WHERE ROWNUM <= 10",
+    "SELECT YEAR(SALES_DATE) AS SALES_YEAR, SUM(AMOUNT) FROM SALES GROUP BY LOCAL.SALES_YEAR",
+    "SELECT AMOUNT * 2 AS DOUBLED FROM SALES WHERE LOCAL.DOUBLED > 100",
+])
+def test_exasol_pseudo_columns_and_local_aliases(query):
+
+    tables = {"CUSTOMERS": {"ID": "DECIMAL", "NAME": "VARCHAR"},
+              "SALES": {"ID": "DECIMAL", "CUSTOMER_ID": "DECIMAL", "SALES_DATE": "DATE", "AMOUNT": "DECIMAL"}}
+
+    assert _validate(query) == []
+    assert _unresolved_columns(parse_sql(query), DB_SCHEMA, tables) == []
+
+
+def test_unknown_column_is_not_enforced():
+
+    query = "SELECT FOO FROM CUSTOMERS"
+
+    assert _validate(query) == []
+    assert _unresolved_columns(parse_sql(query), DB_SCHEMA, {"CUSTOMERS": {"ID": "DECIMAL"}}) != []
+
+
+@pytest.mark.parametrize("query, table", [
+    ("SELECT NAME FROM CUSTOMERZ", "CUSTOMERZ"),
+    ("SELECT c.NAME FROM CUSTOMERS c JOIN ORDERS o ON o.CUSTOMER_ID = c.ID", "ORDERS"),
+])
+def test_unknown_table(query, table):
+
+    assert _validate(query) == [f"Table {DB_SCHEMA}.{table} does not exist."]
+
+
+def test_tables_of_other_schemas_are_not_checked():
+
+    assert _validate("SELECT * FROM OTHER.ANYTHING") == []